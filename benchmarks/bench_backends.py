@@ -0,0 +1,82 @@
+"""
+Compares the pandas and the polars backend on the same synthetic workbook
+
+>>> python benchmarks/bench_backends.py --rows 200000 --blocks 4
+"""
+import argparse
+import collections
+import re
+import time
+import numpy as np
+import pandas as pd
+import polars as pl
+from validpanda.block import Block
+from validpanda.file import File
+from validpanda.spreadsheet import Spreadsheet
+
+COLUMNS = collections.OrderedDict([("id", (None, "int64")),
+                                   ("amount", (None, "float64")),
+                                   ("code", (None, re.compile("[A-Z]{3}[0-9]+"))),
+                                   ("label", (str.upper, "object"))])
+
+
+def workbook(rows, blocks, seed=0):
+    """
+    builds a sheet with *blocks* blocks of *rows* rows next to each other, every value is a string
+
+    :return: pandas dataframe, spreadsheet_allocation of a File
+    """
+    random = np.random.default_rng(seed)
+    parts = []
+    spreadsheet = Spreadsheet()
+    spreadsheet.blocks_allocation = {}
+    for indx in range(blocks):
+        values = np.empty((rows + 1, len(COLUMNS)), dtype=object)
+        values[0] = list(COLUMNS)
+        values[1:, 0] = np.arange(rows).astype(str)
+        values[1:, 1] = random.random(rows).round(4).astype(str)
+        values[1:, 2] = np.char.add("ABC", random.integers(0, 10 ** 6, rows).astype(str))
+        values[1:, 3] = np.char.add("label", random.integers(0, 100, rows).astype(str))
+        parts.append(pd.DataFrame(values, dtype=object))
+        block = Block()
+        block.name = "block{}".format(indx)
+        block.columns_names = COLUMNS
+        block.content_length = rows
+        spreadsheet.blocks_allocation[indx] = {"coordinates": (None, indx - 1 if indx else None), "block": block}
+    dataframe = pd.concat(parts, axis=1, ignore_index=True)
+    return dataframe, {0: {"spreadsheet": spreadsheet, "name": "Sheet1"}}
+
+
+def to_polars(dataframe):
+    return pl.from_pandas(dataframe.rename(columns=str)).cast(pl.String)
+
+
+def best_of(function, repeat):
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        seconds.append(time.perf_counter() - start)
+    return min(seconds)
+
+
+def main():
+    argument_parser = argparse.ArgumentParser(description="pandas vs polars backend")
+    argument_parser.add_argument("--rows", type=int, default=100000)
+    argument_parser.add_argument("--blocks", type=int, default=4)
+    argument_parser.add_argument("--repeat", type=int, default=3)
+    arguments = argument_parser.parse_args()
+
+    dataframe, allocation = workbook(arguments.rows, arguments.blocks)
+    file = File()
+    file.spreadsheets = allocation
+    for name, data in (("pandas", dataframe), ("polars", to_polars(dataframe))):
+        file.data = (data,)
+        assert file.is_valid()
+        seconds = best_of(file.is_valid, arguments.repeat)
+        print("{:<8} {:>10.3f} s  {:>12,.0f} cells/s".format(
+            name, seconds, arguments.rows * arguments.blocks * len(COLUMNS) / seconds))
+
+
+if __name__ == "__main__":
+    main()
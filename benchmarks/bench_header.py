@@ -0,0 +1,61 @@
+"""
+Compares the normalization of the header row of a wide block: the per-cell strip of the original check_header, a
+per-cell numpy ufunc and CompiledBlock.normalize_header, for a clean header and for one where every cell needs
+normalizing. The times include reading the header row from the dataframe.
+
+>>> python benchmarks/bench_header.py --columns 100000
+"""
+import argparse
+import collections
+import time
+import numpy as np
+import pandas as pd
+from validpanda.backends import PANDAS
+from validpanda.compiled import CompiledBlock
+
+
+def header_frame(columns, padded):
+    """
+    :return: dataframe with a header row and one content row, every value is a string
+    """
+    names = ["Column {}".format(indx) for indx in range(columns)]
+    header = [" {} ".format(name) for name in names] if padded else names
+    return pd.DataFrame([header, ["1"] * columns], dtype=object), names
+
+
+def per_cell(value):
+    return "" if value is None or value != value else str(value).strip()
+
+
+def best_of(function, repeat):
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        seconds.append(time.perf_counter() - start)
+    return min(seconds)
+
+
+def main():
+    argument_parser = argparse.ArgumentParser(description="header normalization")
+    argument_parser.add_argument("--columns", type=int, default=100000)
+    argument_parser.add_argument("--repeat", type=int, default=5)
+    arguments = argument_parser.parse_args()
+
+    ufunc = np.frompyfunc(per_cell, 1, 1)
+    for padded in (False, True):
+        dataframe, names = header_frame(arguments.columns, padded)
+        compiled = CompiledBlock(collections.OrderedDict((name, (None, "int64")) for name in names))
+        assert compiled.header_matches(compiled.normalize_header(PANDAS.row(dataframe, 0)))
+        timings = {"baseline": best_of(lambda: tuple(map(lambda c: c.strip(), dataframe.iloc[0])), arguments.repeat),
+                   "per cell": best_of(lambda: ufunc(np.asarray(tuple(dataframe.iloc[0]), dtype=object)),
+                                       arguments.repeat),
+                   "vectorized": best_of(lambda: compiled.normalize_header(PANDAS.row(dataframe, 0)),
+                                         arguments.repeat)}
+        for name, seconds in timings.items():
+            print("{:<8} {:<12} {:>10.2f} ms ({:.2f}x the baseline)".format(
+                "padded" if padded else "clean", name, 1000 * seconds, seconds / timings["baseline"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Measures the cold start of a parser: the import of validpanda.parsers.base_parser, the definition of a schema with
+many blocks (including its regular expressions), the first initialise of a parser and the compilation of its blocks.
+Every measurement runs in a fresh interpreter.
+
+>>> python benchmarks/bench_import.py --blocks 50 --columns 20
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+COLD_START = """
+import json, time
+start = time.perf_counter()
+from validpanda.parsers.base_parser import BaseParser
+imported = time.perf_counter()
+import collections, re
+re.purge()
+blocks = {{"block{{}}".format(b): {{"columns_names": collections.OrderedDict(
+                                     ("col{{}}_{{}}".format(b, c),
+                                      (None, re.compile("[A-Z]{{{{3}}}}{{}}_{{}}".format(b, c)) if c % 2 else "int64"))
+                                     for c in range({columns})),
+                                 "header": True, "content_length": None, "header_pattern": False}}
+          for b in range({blocks})}}
+spreadsheets = {{"spreadsheet0": {{"blocks_allocation": {{b: {{"coordinates": (None, b - 1 if b else None),
+                                                            "block": "block{{}}".format(b)}}
+                                                        for b in range({blocks})}},
+                                  "preprocess_func": None}}}}
+file = {{"spreadsheet_allocation": {{0: {{"name": "Sheet1", "spreadsheet": "spreadsheet0"}}}}, "extension": "csv"}}
+defined = time.perf_counter()
+parser = BaseParser()
+parser.initialise(blocks, spreadsheets, file)
+initialised = time.perf_counter()
+for allocation in parser.file.spreadsheets[0]["spreadsheet"].blocks_allocation.values():
+    allocation["block"].compiled
+compiled = time.perf_counter()
+import sys
+print(json.dumps({{"import": imported - start, "define": defined - imported, "initialise": initialised - defined,
+                  "compile": compiled - initialised, "pandas imported": "pandas" in sys.modules}}))
+"""
+
+
+def main():
+    argument_parser = argparse.ArgumentParser(description="import and initialise time of a parser")
+    argument_parser.add_argument("--blocks", type=int, default=50)
+    argument_parser.add_argument("--columns", type=int, default=20)
+    argument_parser.add_argument("--repeat", type=int, default=5)
+    arguments = argument_parser.parse_args()
+
+    code = COLD_START.format(blocks=arguments.blocks, columns=arguments.columns)
+    runs = [json.loads(subprocess.run([sys.executable, "-c", code], check=True, capture_output=True,
+                                      text=True).stdout) for _ in range(arguments.repeat)]
+    for name in ("import", "define", "initialise", "compile"):
+        print("{:<12} {:>10.2f} ms (median of {})".format(
+            name, 1000 * statistics.median(run[name] for run in runs), arguments.repeat))
+    print("{:<12} {:>10}".format("pandas", "imported" if runs[0]["pandas imported"] else "not imported"))
+
+
+if __name__ == "__main__":
+    main()
@@ -63,6 +63,12 @@ setup(
     install_requires=['pandas'],
     extras_require={
         'about-page':  ["pip-licenses>=1.7.1"],
+        'export': ["pyarrow"],
+        'polars': ["polars"],
+    },
+    entry_points={
+        'console_scripts': ['validpanda=validpanda.cli:main',
+                            'validpanda-service=validpanda.service:main'],
     },
     package_dir={'': source_path},
     zip_safe=False,
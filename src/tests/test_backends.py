@@ -0,0 +1,118 @@
+import re
+import unittest
+from collections import OrderedDict
+from src.tests import test_file
+from src.validpanda.backends import get_backend, PANDAS, POLARS
+from src.validpanda.block import Block
+from src.validpanda.exceptions import ValidationError
+from src.validpanda.file import File
+from src.validpanda.memory import MemoryBudget
+from src.validpanda.sampling import Sampling
+from src.validpanda.spreadsheet import Spreadsheet
+import pandas as pd
+
+try:
+    import polars as pl
+except ImportError:
+    pl = None
+
+
+def to_polars(dataframe):
+    """
+    converts a pandas spreadsheet to a polars one with string columns
+    """
+    return pl.DataFrame({str(column): [None if value is None else str(value) for value in dataframe[column]]
+                         for column in dataframe.columns},
+                        schema={str(column): pl.String for column in dataframe.columns})
+
+
+@unittest.skipIf(pl is None, "polars is not installed")
+class TestBackends(unittest.TestCase):
+    """
+    Tests the pandas and polars backends on the same schema
+    """
+    def setUp(self):
+        file_test = test_file.TestFile()
+        file_test.setUp()
+        self.file = file_test.file_xlsx
+        self.dataframe = self.file.data[0]
+
+        block = Block()
+        block.columns_names = OrderedDict([("int", (None, "int64")),
+                                           ("float", (None, "float64")),
+                                           ("date", (None, "datetime64[ns]")),
+                                           ("code", (None, re.compile("[A-Z]+$")))
+                                           ])
+        spreadsheet = Spreadsheet()
+        spreadsheet.blocks_allocation = {0: {"coordinates": (None, None), "block": block}}
+        self.typed_file = File()
+        self.typed_file.spreadsheets = {0: {"name": "Sheet1", "spreadsheet": spreadsheet}}
+        self.typed_dataframe = pd.DataFrame([["int", "float", "date", "code"],
+                                             ["1", "1.5", "2020-01-02", "ABC"],
+                                             ["2", "2.5", "2020-01-03", "DEF"]], dtype=object)
+
+    def test_get_backend(self):
+        self.assertIs(get_backend(self.dataframe), PANDAS)
+        self.assertIs(get_backend(to_polars(self.dataframe)), POLARS)
+
+    def test_find_row(self):
+        for backend, dataframe in ((PANDAS, self.dataframe), (POLARS, to_polars(self.dataframe))):
+            self.assertEqual(backend.find_row(dataframe, ("hed1", "hed2", "hed3")), 5)
+            self.assertIsNone(backend.find_row(dataframe, ("hed2", "hed1")))
+
+    def test_validity(self):
+        self.file.data = (to_polars(self.dataframe),)
+        self.assertTrue(self.file.is_valid())
+        self.assertTrue(self.file.is_valid(staged=True))
+
+    def test_same_failures(self):
+        """
+        test that both backends report the same first failure
+
+        :return:
+        """
+        for file, row, column, value, valid in ((self.file, 2, 1, "x", False),
+                                                (self.file, 1, 5, "[].ertz", False),
+                                                (self.file, 6, 6, "six", False),
+                                                (self.file, 0, 2, "colX", False),
+                                                # python strips whitespace and underscores of numbers, polars not
+                                                (self.typed_file, 2, 0, " 2", True),
+                                                (self.typed_file, 2, 0, "2.5", False),
+                                                (self.typed_file, 2, 1, " 2.5", True),
+                                                (self.typed_file, 2, 1, "1_0.5", True),
+                                                (self.typed_file, 2, 1, "2,5", False),
+                                                (self.typed_file, 1, 2, "2020/01/02", True),
+                                                (self.typed_file, 1, 2, "not a date", False),
+                                                # $ matches before a newline at the end in python
+                                                (self.typed_file, 2, 3, "DEF\n", True),
+                                                (self.typed_file, 2, 3, "DEF1", False)):
+            dataframe = (self.dataframe if file is self.file else self.typed_dataframe).copy()
+            dataframe.loc[row, column] = value
+            failures = []
+            for data in (dataframe, to_polars(dataframe)):
+                file.data = (data,)
+                try:
+                    self.assertEqual(file.is_valid(), valid)
+                    failures.append(None)
+                except ValidationError as e:
+                    self.assertFalse(valid)
+                    failures.append((str(e), e.row, e.column))
+            self.assertEqual(failures[0], failures[1], value)
+
+    def test_types(self):
+        self.file.data = (pl.DataFrame({"0": [1, 2]}),)
+        self.assertRaises(AssertionError, self.file.is_valid)
+
+    def test_sampling(self):
+        self.file.data = (to_polars(self.dataframe),)
+        self.assertRaises(NotImplementedError, self.file.is_valid, sampling=Sampling())
+
+    def test_memory_budget(self):
+        self.file.data = (to_polars(self.dataframe),)
+        for staged in (False, True):
+            self.assertRaises(NotImplementedError, self.file.is_valid, staged=staged,
+                              memory_budget=MemoryBudget(limit=10 ** 9))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from collections import OrderedDict
+from src.validpanda.parsers.base_parser import BaseParser
+
+
+class ExampleParser(BaseParser):
+    blocks = {"block0": {"columns_names": OrderedDict([("col1", (None, 'int64')),
+                                                       ("col2", (None, 'int64')),
+                                                       ]),
+                         "header": True,
+                         "content_length": None,
+                         "header_pattern": False,
+                         },
+              }
+    spreadsheets = {"spreadsheet0": {"blocks_allocation": {0: {"coordinates": (None, None), "block": "block0"},
+                                                           },
+                                     "preprocess_func": None
+                                     },
+                    }
+    file = {"spreadsheet_allocation": {0: {"name": "Sheet1", "spreadsheet": "spreadsheet0"},
+                                       },
+            "extension": "csv"
+            }
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.initialise(ExampleParser.blocks,
+                        ExampleParser.spreadsheets,
+                        ExampleParser.file)
+
+
+class TestBaseParser(unittest.TestCase):
+    """
+    Tests BaseParser class
+    """
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.valid_path = os.path.join(self.directory.name, "valid.csv")
+        with open(self.valid_path, "w") as f:
+            f.write("col1,col2\n1,2\n3,4\n")
+        self.invalid_path = os.path.join(self.directory.name, "invalid.csv")
+        with open(self.invalid_path, "w") as f:
+            f.write("col1,col2\n1,2\nthree,4\n")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_initialise_twice(self):
+        """
+        test that initialise does not change the class level definitions
+
+        :return:
+        """
+        first, second = ExampleParser(), ExampleParser()
+        self.assertIsNot(first.file.spreadsheets[0]["spreadsheet"], second.file.spreadsheets[0]["spreadsheet"])
+        self.assertEqual(ExampleParser.spreadsheets["spreadsheet0"]["blocks_allocation"][0]["block"], "block0")
+
+    def test_validate(self):
+        self.assertTrue(ExampleParser(file_path=self.valid_path).validate())
+        self.assertRaises(AssertionError, ExampleParser().validate, self.invalid_path)
+
+    def test_validate_chunks(self):
+        self.assertTrue(ExampleParser().validate(self.valid_path, chunksize=1))
+        self.assertRaises(AssertionError, ExampleParser().validate, self.invalid_path, chunksize=1)
+
+    def test_avalidate(self):
+        self.assertTrue(asyncio.run(ExampleParser().avalidate(self.valid_path, timeout=10)))
+        self.assertRaises(AssertionError, asyncio.run, ExampleParser().avalidate(self.invalid_path))
+
+    def test_lazy_import(self):
+        """
+        test that pandas is only imported when a file is read
+
+        :return:
+        """
+        code = "import sys; import src.validpanda.parsers.base_parser; print('pandas' in sys.modules)"
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.strip(), "False")
+
+
+if __name__ == '__main__':
+    unittest.main()
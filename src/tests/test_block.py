@@ -1,5 +1,6 @@
 import unittest
 from src.validpanda.block import Block
+from src.validpanda.exceptions import ValidationError
 from collections import OrderedDict
 import pandas as pd
 
@@ -41,6 +42,56 @@ class TestBlock(unittest.TestCase):
     def test_validity(self):
         self.assertTrue(self.valid_block.is_valid(self.test_data))
 
+    def test_header_normalization(self):
+        data = self.test_data.copy()
+        data.loc[0] = [" COL1", "col\n2"]
+        self.assertRaises(ValidationError, self.valid_block.is_valid, data)
+        self.valid_block.header_normalization = ("strip", "casefold")
+        self.assertRaises(ValidationError, self.valid_block.is_valid, data)
+        self.valid_block.header_normalization = ("casefold", "collapse_whitespace", "strip")
+        data.loc[0, 1] = "col 2"
+        self.valid_block.columns_names = OrderedDict([("col1", (None, 'int64')), ("Col  2", (None, 'int64'))])
+        self.assertTrue(self.valid_block.is_valid(data))
+
+    def test_header_pattern(self):
+        data = pd.DataFrame([["col1", "col2", "col1", "col2", 3.0], [1, 2, 3, 4, 5]], dtype=object)
+        self.valid_block.header_pattern = True
+        with self.assertRaises(ValidationError) as context:
+            self.valid_block.is_valid(data)
+        self.assertEqual(context.exception.column_index, 4)
+        self.assertTrue(self.valid_block.is_valid(data.iloc[:, :4]))
+
+    def test_failing_row(self):
+        """
+        test that the first failing row is reported
+
+        :return:
+        """
+        self.test_data.loc[3, 1] = "four"
+        with self.assertRaises(ValidationError) as context:
+            self.valid_block.is_valid(self.test_data)
+        self.assertEqual((context.exception.column, context.exception.row), ("col2", 3))
+
+    def test_partitions_validity(self):
+        for executor in ("thread", "process"):
+            self.valid_block.partitions = 2
+            self.valid_block.partition_executor = executor
+            self.assertTrue(self.valid_block.is_valid(self.test_data))
+
+    def test_partitions_first_failure(self):
+        """
+        test that partitions report the same failure as the serial validation
+
+        :return:
+        """
+        self.test_data.loc[1, 1] = "three"
+        self.test_data.loc[4, 0] = "five"
+        self.valid_block.partitions = 2
+        self.valid_block.partition_executor = "thread"
+        with self.assertRaises(ValidationError) as context:
+            self.valid_block.is_valid(self.test_data)
+        self.assertEqual((context.exception.column, context.exception.row), ("col1", 4))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,95 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+import unittest
+from src.validpanda import cli
+from src.tests.test_base_parser import ExampleParser
+
+
+class CrashingParser(ExampleParser):
+    """
+    kills its worker process on files named crash.csv, as the OOM killer would, and takes a second for slow.csv
+    """
+    def read(self, file_path=None):
+        name = os.path.basename(file_path or self.file_path)
+        if name == "crash.csv":
+            os._exit(1)
+        if name == "slow.csv":
+            time.sleep(1)
+        return super().read(file_path)
+
+
+class TestCli(unittest.TestCase):
+    """
+    Tests the validpanda console command
+    """
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.data = os.path.join(self.directory.name, "data")
+        os.makedirs(os.path.join(self.data, "nested"))
+        for name, content in (("a.csv", "col1,col2\n1,2\n"),
+                              (os.path.join("nested", "b.csv"), "col1,col2\nthree,2\n"),
+                              ("c.csv", "col1,wrong\n1,2\n")):
+            with open(os.path.join(self.data, name), "w") as f:
+                f.write(content)
+        self.output = os.path.join(self.directory.name, "results.jsonl")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def run_cli(self, *paths):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return cli.main(["src.tests.test_base_parser:ExampleParser", *paths,
+                             "--workers", "2", "--output", self.output])
+
+    def read_results(self):
+        with open(self.output) as f:
+            return {os.path.basename(result["path"]): result for result in map(json.loads, f)}
+
+    def test_results(self):
+        self.assertEqual(self.run_cli(self.data), 1)
+        results = self.read_results()
+        self.assertEqual({name: result["status"] for name, result in results.items()},
+                         {"a.csv": "valid", "b.csv": "invalid", "c.csv": "invalid"})
+        self.assertEqual((results["b.csv"]["sheet"], results["b.csv"]["column"], results["b.csv"]["row"]),
+                         ("Sheet1", "col1", 1))
+
+    def test_resume(self):
+        """
+        test that finished files are skipped when the command runs again
+
+        :return:
+        """
+        self.run_cli(os.path.join(self.data, "a.csv"))
+        self.run_cli(os.path.join(self.data, "*.csv"))
+        with open(self.output) as f:
+            self.assertEqual(len(f.readlines()), 2)
+
+    def test_worker_died(self):
+        """
+        test that a file killing its worker is reported as an error and the other files are still validated
+
+        :return:
+        """
+        with open(os.path.join(self.data, "crash.csv"), "w") as f:
+            f.write("col1,col2\n1,2\n")
+        manifest = os.path.join(self.directory.name, "manifest")
+        with contextlib.redirect_stdout(io.StringIO()):
+            cli.main(["src.tests.test_cli:CrashingParser", self.data, "--workers", "2", "--output", self.output,
+                      "--manifest", manifest])
+        results = self.read_results()
+        self.assertEqual({name: result["status"] for name, result in results.items()},
+                         {"a.csv": "valid", "b.csv": "invalid", "c.csv": "invalid", "crash.csv": "error"})
+        self.assertIn("BrokenProcessPool", results["crash.csv"]["message"])
+        self.assertEqual(cli.read_manifest(manifest), {result["path"] for result in results.values()})
+
+    def test_load_parser_class(self):
+        self.assertEqual(cli.load_parser_class("src.tests.test_base_parser.ExampleParser").__name__, "ExampleParser")
+        self.assertRaises(ValueError, cli.load_parser_class, "ExampleParser")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import re
+import unittest
+from collections import OrderedDict
+from unittest import mock
+from src.validpanda.block import Block
+from src.validpanda.compiled import CompiledBlock, RegexChecker, DtypeChecker
+from src.validpanda.helpers import Helper
+import pandas as pd
+
+
+class TestCompiledBlock(unittest.TestCase):
+    """
+    Tests CompiledBlock class
+    """
+    def setUp(self):
+        self.columns_names = OrderedDict([("col1", (None, 'int64')),
+                                          ("col2", (None, re.compile("[a-z]+"))),
+                                          ])
+
+    def test_shared(self):
+        """
+        test that blocks with the same definition share one compiled block
+
+        :return:
+        """
+        first, second = Block(), Block()
+        first.columns_names = self.columns_names
+        second.columns_names = OrderedDict(self.columns_names)
+        self.assertIs(first.compiled, second.compiled)
+        self.assertEqual(first.compiled.header, ("col1", "col2"))
+
+    def test_kept_on_block(self):
+        """
+        test that the compiled block is looked up once and again after the definition is assigned
+
+        :return:
+        """
+        block = Block()
+        block.columns_names = self.columns_names
+        compiled = block.compiled
+        with mock.patch.object(CompiledBlock, "get", side_effect=AssertionError("looked up again")):
+            self.assertIs(block.compiled, compiled)
+        block.header_normalization = ("casefold",)
+        self.assertEqual(block.compiled.header_normalization, ("casefold",))
+        block.columns_names = OrderedDict([("col3", (None, 'int64'))])
+        self.assertEqual(block.compiled.header, ("col3",))
+
+    def test_checkers(self):
+        checkers = CompiledBlock.get(self.columns_names).checkers
+        self.assertIsInstance(checkers["col1"][1], DtypeChecker)
+        self.assertIsInstance(checkers["col2"][1], RegexChecker)
+        self.assertEqual(checkers["col1"][1].first_failure(pd.Series([1, "2", "x", 4], dtype=object)), 2)
+        self.assertIsNone(checkers["col2"][1].first_failure(pd.Series(["a", "b"], dtype=object)))
+        self.assertEqual(checkers["col2"][1].first_failure(pd.Series(["a", 1], dtype=object)), 1)
+
+    def test_invalid_definition(self):
+        self.assertRaises(AssertionError, CompiledBlock.get, {"col1": (None, 'int64')})
+
+    def test_normalize_header(self):
+        compiled = CompiledBlock.get(OrderedDict([(" Col  One ", (None, 'int64'))]),
+                                     ("strip", "casefold", "collapse_whitespace"))
+        self.assertEqual(compiled.normalized_header, ("col one",))
+        self.assertEqual(list(compiled.normalize_header(("COL\tONE ", None, float("nan"), pd.NA, 2023))),
+                         ["col one", "", "", "", "2023"])
+        self.assertIsNot(compiled, CompiledBlock.get(OrderedDict([(" Col  One ", (None, 'int64'))])))
+        self.assertRaises(AssertionError, CompiledBlock, self.columns_names, ("lower",))
+
+    def test_pattern_length(self):
+        """
+        test that the pattern length is the one of Helper.find_pattern
+
+        :return:
+        """
+        compiled = CompiledBlock.get(OrderedDict([("1", (None, 'int64')), ("2", (None, 'int64'))]))
+        for header in (("1", "2", "1", "2", "1", "2", "1", "2", "3", "4", "5"), ("1", "2", "1"), ("2", "1"), ("1", "2")):
+            self.assertEqual(compiled.pattern_length(compiled.normalize_header(header)),
+                             Helper.find_pattern(header, compiled.header))
+        self.assertRaises(ValueError, compiled.pattern_length, compiled.normalize_header(("1",)))
+
+    def test_unhashable(self):
+        columns_names = OrderedDict([("col1", (None, {"unhashable": "dtype"}))])
+        self.assertIsNot(CompiledBlock.get(columns_names), CompiledBlock.get(columns_names))
+
+
+if __name__ == '__main__':
+    unittest.main()
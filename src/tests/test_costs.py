@@ -0,0 +1,89 @@
+import os
+import re
+import tempfile
+import unittest
+from collections import OrderedDict
+from src.validpanda.block import Block
+from src.validpanda.costs import CostModel
+from src.validpanda.exceptions import ValidationError
+from src.validpanda.file import File
+from src.validpanda.spreadsheet import Spreadsheet
+from src.tests import test_file
+import pandas as pd
+
+
+class TestCostModel(unittest.TestCase):
+    """
+    Tests CostModel class
+    """
+    def setUp(self):
+        self.block = Block()
+        self.block.columns_names = OrderedDict([("col1", (lambda x: x, re.compile("[0-9]+"))),
+                                                ("col2", (None, re.compile("[0-9]+"))),
+                                                ("col3", (None, 'int64')),
+                                                ])
+        self.test_data = pd.DataFrame([["col1", "col2", "col3"],
+                                       ["1", "2", 3],
+                                       ["4", "5", 6],
+                                       ])
+
+    def test_static_order(self):
+        content, header_dict = self.block.check_header(self.test_data)
+        self.assertEqual(self.block.columns_order(content, header_dict, CostModel()), [2, 1, 0])
+        self.assertEqual(self.block.columns_order(content, header_dict), [0, 1, 2])
+
+    def test_learned_order(self):
+        cost_model = CostModel()
+        cost_model.record(self.block, "col3", 1.0, 10)
+        content, header_dict = self.block.check_header(self.test_data)
+        self.assertEqual(self.block.columns_order(content, header_dict, cost_model), [1, 0, 2])
+
+    def test_record(self):
+        cost_model = CostModel()
+        self.assertTrue(self.block.is_valid(self.test_data, cost_model=cost_model))
+        self.assertEqual(set(cost_model.timings), {"dummy_block|col1", "dummy_block|col2", "dummy_block|col3"})
+
+    def test_spreadsheet_keys(self):
+        """
+        test that the timings of blocks with the same name in different spreadsheets do not collide
+
+        :return:
+        """
+        file_test = test_file.TestFile()
+        file_test.setUp()
+        cost_model = CostModel()
+        file_test.file_xlsx.data = (file_test.file_xlsx.data[0], file_test.file_xlsx.data[0].copy())
+        self.assertTrue(file_test.file_xlsx.is_valid(cost_model=cost_model))
+        self.assertIn("Sheet1|dummy_block|col1", cost_model.timings)
+        self.assertIn("Sheet2|dummy_block|col1", cost_model.timings)
+
+    def test_staged_default(self):
+        """
+        test that staged validation orders the columns by the static estimates without a cost model
+
+        :return:
+        """
+        spreadsheet = Spreadsheet()
+        spreadsheet.blocks_allocation = {0: {"coordinates": (None, None), "block": self.block}}
+        file = File()
+        file.spreadsheets = {0: {"name": "Sheet1", "spreadsheet": spreadsheet}}
+        data = self.test_data.astype(object)
+        data.loc[1, 0] = "x"
+        data.loc[2, 2] = "y"
+        file.data = (data,)
+        for staged, column in ((False, "col1"), (True, "col3")):
+            with self.assertRaises(ValidationError) as context:
+                file.is_valid(staged=staged)
+            self.assertEqual(context.exception.column, column)
+
+    def test_save_load(self):
+        cost_model = CostModel()
+        cost_model.record(self.block, "col3", 1.0, 10)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "costs.json")
+            cost_model.save(path)
+            self.assertEqual(CostModel.load(path).timings, {"dummy_block|col3": 0.1})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import os
+import re
+import tempfile
+import unittest
+from collections import OrderedDict
+from unittest import mock
+from src.validpanda.block import Block
+from src.validpanda.spreadsheet import Spreadsheet
+from src.validpanda.file import File
+from src.validpanda.export import Exporter
+import pandas as pd
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+
+class TestExporter(unittest.TestCase):
+    """
+    Tests Exporter class
+    """
+    def setUp(self):
+        first_block = Block()
+        first_block.name = "first"
+        first_block.columns_names = OrderedDict([("col1", (None, 'int64')),
+                                                 ("col2", (None, 'int64'))
+                                                 ])
+        first_block.content_length = 2
+        pattern_block = Block()
+        pattern_block.name = "pattern"
+        pattern_block.columns_names = OrderedDict([("hed1", (None, 'int64')),
+                                                   ("hed2", (None, re.compile("[a-z]")))
+                                                   ])
+        pattern_block.header_pattern = True
+        spreadsheet = Spreadsheet()
+        spreadsheet.blocks_allocation = {0: {"coordinates": (None, None), "block": first_block},
+                                         1: {"coordinates": (0, None), "block": pattern_block},
+                                         }
+        self.file = File()
+        self.file.spreadsheets = {0: {"name": "Sheet1", "spreadsheet": spreadsheet}}
+        self.file.data = (pd.DataFrame([["col1", "col2", None, None],
+                                        [1, 2, None, None],
+                                        [3, 4, None, None],
+                                        ["hed1", "hed2", "hed1", "hed2"],
+                                        [5, "a", 6, "b"],
+                                        [7, "c", 8, "d"],
+                                        ], dtype=object),)
+
+    def test_frames(self):
+        frames = {block.name: frame for name, block_id, block, frame in Exporter().iter_frames(self.file)}
+        self.assertEqual(list(frames["first"]["col1"]), [1, 3])
+        self.assertEqual(str(frames["first"]["col1"].dtype), "int64")
+        pattern = frames["pattern"]
+        self.assertEqual(list(pattern.columns), ["hed1", "hed2", "row", "repeat"])
+        self.assertEqual(list(pattern["hed1"]), [5, 7, 6, 8])
+        self.assertEqual(list(pattern["hed2"]), ["a", "c", "b", "d"])
+        self.assertEqual(list(pattern["repeat"]), [0, 0, 1, 1])
+        self.assertEqual(list(pattern["row"]), [1, 2, 1, 2])
+
+    def test_reuse_layout(self):
+        """
+        test that the layout of the validation is reused and only resolved again for other data
+
+        :return:
+        """
+        self.assertTrue(self.file.is_valid())
+        spreadsheet = self.file.spreadsheets[0]["spreadsheet"]
+        with mock.patch.object(Spreadsheet, "get_block_size", side_effect=AssertionError("resolved again")), \
+                mock.patch.object(Block, "check_header", side_effect=AssertionError("checked again")):
+            self.test_frames()
+        self.file.data = (self.file.data[0].copy(),)
+        self.assertIsNone(spreadsheet.resolved_layout(self.file.data[0]))
+        self.test_frames()
+
+    def test_wide_format(self):
+        frames = {block.name: frame for name, block_id, block, frame in
+                  Exporter(long_format=False).iter_frames(self.file)}
+        self.assertEqual(list(frames["pattern"].columns), ["hed1_0", "hed2_1", "hed1_2", "hed2_3"])
+
+    @unittest.skipIf(pq is None, "pyarrow is not installed")
+    def test_write_parquet(self):
+        with tempfile.TemporaryDirectory() as directory:
+            paths = Exporter().write_parquet(self.file, directory)
+            self.assertEqual(paths, [os.path.join(directory, "Sheet1", "0_first.parquet"),
+                                     os.path.join(directory, "Sheet1", "1_pattern.parquet")])
+            self.assertEqual(pq.read_table(paths[1]).num_rows, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,10 +1,14 @@
 """
 TODO
 """
+import asyncio
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 from src.validpanda.block import Block
 from src.validpanda.spreadsheet import Spreadsheet
 from src.validpanda.file import File
+from src.validpanda.exceptions import ValidationError
+from src.validpanda.costs import CostModel
 import re
 import pandas as pd
 from collections import OrderedDict
@@ -114,3 +118,148 @@ class TestFile(unittest.TestCase):
         df[0] = df[0].astype("category")
         self.file_xlsx.data = (df,)
         self.assertRaises(AssertionError, self.file_xlsx.is_valid)
+
+    def test_staged_validity(self):
+        cost_model = CostModel()
+        self.assertTrue(self.file_xlsx.is_valid(staged=True, cost_model=cost_model))
+        self.assertIn("Sheet1|dummy_block|hed1", cost_model.timings)
+
+    def test_staged_structure_first(self):
+        """
+        test that a wrong header in the second spreadsheet is found before a wrong value in the first one
+
+        :return:
+        """
+        df = self.file_xlsx.data[0]
+        invalid_values = df.copy()
+        invalid_values.loc[1, 0] = "three"
+        invalid_header = df.copy()
+        invalid_header.loc[5, 6] = "hed5"
+        self.file_xlsx.data = (invalid_values, invalid_header)
+        with self.assertRaises(ValidationError) as context:
+            self.file_xlsx.is_valid()
+        self.assertEqual(context.exception.column, "col1")
+        with self.assertRaises(ValidationError) as context:
+            self.file_xlsx.is_valid(staged=True)
+        self.assertEqual((context.exception.block, context.exception.row), ("dummy_block", 0))
+
+    def test_stream_validity(self):
+        file, data = self.stream_file()
+        self.assertTrue(file.is_valid_stream((self.chunks(data, 4),)))
+
+    def test_stream_invalidity(self):
+        """
+        test that a failure in a later chunk reports the row inside of the block
+
+        :return:
+        """
+        file, data = self.stream_file()
+        data.loc[9, 0] = "nine"
+        with self.assertRaises(ValidationError) as context:
+            file.is_valid_stream((self.chunks(data, 4),))
+        self.assertEqual(context.exception.row, 6)
+        file.data = (data,)
+        with self.assertRaises(ValidationError) as context:
+            file.is_valid()
+        self.assertEqual(context.exception.row, 6)
+        self.assertRaises(ValueError, file.is_valid_stream, (self.chunks(data, 2),))
+
+        # the first failing column wins, even if another column fails in an earlier chunk
+        file.spreadsheets[0]["spreadsheet"].blocks_allocation[1]["block"].columns_names = \
+            OrderedDict([("col3", (None, 'int64')), ("col4", (None, 'int64'))])
+        data = pd.DataFrame([["col1", "col2"], [1, 2], [3, 4], ["col3", "col4"]] + [[i, i] for i in range(12)],
+                            dtype=object)
+        data.loc[13, 0] = "ten"
+        data.loc[5, 1] = "two"
+        failures = []
+        for stream in (False, True):
+            file.data = (data,)
+            with self.assertRaises(ValidationError) as context:
+                file.is_valid_stream((self.chunks(data, 4),)) if stream else file.is_valid()
+            failures.append((context.exception.column, context.exception.row))
+        self.assertEqual(failures, [("col3", 10), ("col3", 10)])
+
+    def test_stream_open_ended_block(self):
+        """
+        test that a block without content_length whose next block starts after the first chunk asks for a bigger
+        chunk size
+
+        :return:
+        """
+        file, _ = self.stream_file()
+        file.spreadsheets[0]["spreadsheet"].blocks_allocation[0]["block"].content_length = None
+        data = pd.DataFrame([["col1", "col2"]] + [[i, i] for i in range(6)] + [["col3", None]] +
+                            [[i, None] for i in range(10)], dtype=object)
+        with self.assertRaises(ValueError) as context:
+            file.is_valid_stream((self.chunks(data, 4),))
+        self.assertIn("increase the chunk size", str(context.exception))
+        self.assertTrue(file.is_valid_stream((self.chunks(data, 8),)))
+        file.data = (data,)
+        self.assertTrue(file.is_valid())
+
+    def test_normalized_next_header(self):
+        """
+        test that the block after an open-ended block is found by its normalized header
+
+        :return:
+        """
+        file, _ = self.stream_file()
+        blocks_allocation = file.spreadsheets[0]["spreadsheet"].blocks_allocation
+        blocks_allocation[0]["block"].content_length = None
+        blocks_allocation[1]["block"].header_normalization = ("strip", "casefold")
+        data = pd.DataFrame([["col1", "col2"], [1, 2], [3, 4], [" COL3", None], [5, None], ["six", None]],
+                            dtype=object)
+        file.data = (data,)
+        with self.assertRaises(ValidationError) as context:
+            file.is_valid()
+        self.assertEqual((context.exception.column, context.exception.row), ("col3", 2))
+        data.loc[5, 0] = 6
+        self.assertTrue(file.is_valid())
+        self.assertEqual(blocks_allocation[0]["block"].calculated_row_length, 2)
+
+    @staticmethod
+    def chunks(data, chunksize):
+        for start in range(0, data.shape[0], chunksize):
+            yield data.iloc[start:start + chunksize]
+
+    @staticmethod
+    def stream_file():
+        first_block = Block()
+        first_block.columns_names = OrderedDict([("col1", (None, 'int64')),
+                                                 ("col2", (None, 'int64'))
+                                                 ])
+        first_block.content_length = 2
+        second_block = Block()
+        second_block.columns_names = OrderedDict([("col3", (None, 'int64'))])
+        spreadsheet = Spreadsheet()
+        spreadsheet.blocks_allocation = {0: {"coordinates": (None, None), "block": first_block},
+                                         1: {"coordinates": (0, None), "block": second_block},
+                                         }
+        file = File()
+        file.spreadsheets = {0: {"name": "Sheet1", "spreadsheet": spreadsheet}}
+        data = pd.DataFrame([["col1", "col2"], [1, 2], [3, 4], ["col3", None]] + [[i, None] for i in range(10)],
+                            dtype=object)
+        return file, data
+
+    def test_async_validity(self):
+        self.file_xlsx.data = (self.file_xlsx.data[0], self.file_xlsx.data[0].copy())
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            self.assertTrue(asyncio.run(self.file_xlsx.ais_valid(executor=executor, timeout=10)))
+
+    def test_async_events(self):
+        """
+        test that one progress event per spreadsheet is yielded
+
+        :return:
+        """
+        async def collect():
+            return [event async for event in self.file_xlsx.aiter_valid()]
+
+        events = asyncio.run(collect())
+        self.assertEqual([(event["name"], event["valid"]) for event in events], [("Sheet1", True)])
+
+    def test_async_invalidity(self):
+        df = self.file_xlsx.data[0].copy()
+        df.loc[1, 0] = "three"
+        self.file_xlsx.data = (df,)
+        self.assertRaises(AssertionError, asyncio.run, self.file_xlsx.ais_valid())
@@ -13,6 +13,10 @@ class TestHelpers(unittest.TestCase):
             test_list.append(i)
         self.assertEqual(test_list, [(1, 2), (3, 4)]), "chunks function is wrong"
 
+    def test_partitions(self):
+        self.assertEqual(list(Helper.partitions(10, 3)), [(0, 4), (4, 7), (7, 10)])
+        self.assertEqual(list(Helper.partitions(2, 4)), [(0, 1), (1, 2)])
+
     def test_find_pattern1(self):
         """
         test find_pattern functionality
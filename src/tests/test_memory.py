@@ -0,0 +1,98 @@
+import tracemalloc
+import unittest
+from collections import OrderedDict
+from src.validpanda.block import Block
+from src.validpanda.spreadsheet import Spreadsheet
+from src.validpanda.file import File
+from src.validpanda.memory import MemoryBudget
+from src.validpanda.exceptions import MemoryBudgetExceeded, ValidationError
+import pandas as pd
+
+
+class TestMemoryBudget(unittest.TestCase):
+    """
+    Tests MemoryBudget class
+    """
+    def setUp(self):
+        block = Block()
+        block.columns_names = OrderedDict([("col1", (None, 'int64')),
+                                           ("col2", (None, 'int64')),
+                                           ])
+        spreadsheet = Spreadsheet()
+        spreadsheet.blocks_allocation = {0: {"coordinates": (None, None), "block": block}}
+        self.file = File()
+        self.file.spreadsheets = {0: {"name": "Sheet1", "spreadsheet": spreadsheet}}
+        self.file.data = (pd.DataFrame([["col1", "col2"]] + [[i, i] for i in range(1000)], dtype=object),)
+        self.size = MemoryBudget.size(self.file.data[0])
+
+    def test_peak(self):
+        for staged in (False, True):
+            memory_budget = MemoryBudget(limit=10 * self.size)
+            self.assertTrue(self.file.is_valid(memory_budget=memory_budget, staged=staged))
+            self.assertGreater(memory_budget.peak, self.size)
+            self.assertEqual(memory_budget.used, 0)
+            self.assertTrue({"raw", "block", "column"} <= set(memory_budget.report()["stages"]))
+
+    def test_exceeded(self):
+        memory_budget = MemoryBudget(limit=self.size // 2)
+        with self.assertRaises(MemoryBudgetExceeded) as context:
+            self.file.is_valid(memory_budget=memory_budget)
+        self.assertEqual(context.exception.stage, "raw")
+        self.assertEqual(memory_budget.used, 0)
+
+    def test_chunked_fallback(self):
+        """
+        test that blocks whose columns do not fit are validated in chunks, with the same failure
+
+        :return:
+        """
+        # the converted column and its mask need 2 * 8 bytes per row, only half of the rows fit
+        memory_budget = MemoryBudget(limit=self.size + 8 * 1000)
+        self.assertTrue(self.file.is_valid(memory_budget=memory_budget))
+        self.assertLessEqual(memory_budget.peak, memory_budget.limit)
+        self.file.data[0].loc[900, 0] = "x"
+        self.file.data[0].loc[10, 1] = "x"
+        with self.assertRaises(ValidationError) as context:
+            self.file.is_valid(memory_budget=memory_budget)
+        self.assertEqual((context.exception.column, context.exception.row), ("col1", 900))
+        memory_budget.chunked_fallback = False
+        self.assertRaises(MemoryBudgetExceeded, self.file.is_valid, memory_budget=memory_budget)
+
+    def test_real_allocation(self):
+        """
+        test that slices and copy-on-write copies of string columns are not charged again, so the reported peak is
+        close to what the validation really allocates on top of the raw dataframe
+
+        :return:
+        """
+        self.file.data = (pd.DataFrame([["col1", "col2"]] + [[str(i), str(i)] for i in range(20000)], dtype=object),)
+        raw = MemoryBudget.size(self.file.data[0])
+        for staged in (False, True):
+            memory_budget = MemoryBudget(limit=2 * raw)
+            self.file.is_valid(memory_budget=memory_budget, staged=staged)
+            tracemalloc.start()
+            try:
+                self.assertTrue(self.file.is_valid(memory_budget=memory_budget, staged=staged))
+                allocated = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+            self.assertLessEqual(memory_budget.peak - raw, 4 * allocated)
+            self.assertGreaterEqual(memory_budget.peak - raw, allocated / 2)
+
+    def test_preprocess_copy(self):
+        """
+        test that the dataframe of a preprocessing function is charged if it is a copy
+
+        :return:
+        """
+        spreadsheet = self.file.spreadsheets[0]["spreadsheet"]
+        for preprocess_func, charged in ((lambda dataframe: dataframe.reset_index(drop=True), False),
+                                         (lambda dataframe: dataframe.copy(), True)):
+            spreadsheet.preprocess_func = preprocess_func
+            memory_budget = MemoryBudget(limit=10 * self.size)
+            self.assertTrue(self.file.is_valid(memory_budget=memory_budget))
+            self.assertEqual(memory_budget.peaks["preprocessed"] >= self.size, charged)
+
+
+if __name__ == '__main__':
+    unittest.main()
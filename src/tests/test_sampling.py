@@ -0,0 +1,60 @@
+import unittest
+from src.validpanda.block import Block
+from src.validpanda.sampling import Sampling
+from collections import OrderedDict
+import pandas as pd
+
+
+class TestSampling(unittest.TestCase):
+    """
+    Tests Sampling class
+    """
+    def setUp(self):
+        self.block = Block()
+        self.block.columns_names = OrderedDict([("col1", (None, 'int64')),
+                                                ("col2", (None, 'int64')),
+                                                ])
+        self.test_data = pd.DataFrame([["col1", "col2"]] + [[i, i + 1] for i in range(100)], dtype=object)
+
+    def test_sample_size(self):
+        sampling = Sampling(size=10, seed=1)
+        self.assertTrue(self.block.is_valid(self.test_data, sampling=sampling))
+        self.assertEqual(sampling.report[0]["sampled"], 10)
+        self.assertEqual(sampling.report[0]["rows"], 100)
+        self.assertAlmostEqual(sampling.invalid_fraction_bound, 0.3)
+
+    def test_reproducible(self):
+        """
+        test that the same seed gives the same sample
+
+        :return:
+        """
+        content = self.test_data.iloc[1:]
+        for stratified in (False, True):
+            first = Sampling(size=10, seed=7, stratified=stratified).take(content, self.block)
+            second = Sampling(size=10, seed=7, stratified=stratified).take(content, self.block)
+            self.assertEqual(list(first.index), list(second.index))
+            self.assertEqual(list(first.index), sorted(first.index))
+
+    def test_exhaustive(self):
+        """
+        test that small blocks are validated completely
+
+        :return:
+        """
+        sampling = Sampling(size=1000)
+        self.block.is_valid(self.test_data, sampling=sampling)
+        self.assertEqual(sampling.invalid_fraction_bound, 0.0)
+
+    def test_header_checked(self):
+        """
+        test that headers are still checked exactly
+
+        :return:
+        """
+        self.test_data.loc[0, 1] = "col3"
+        self.assertRaises(AssertionError, self.block.is_valid, self.test_data, sampling=Sampling(size=1))
+
+
+if __name__ == '__main__':
+    unittest.main()
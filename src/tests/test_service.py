@@ -0,0 +1,133 @@
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+from src.validpanda import service
+
+
+class TestService(unittest.TestCase):
+    """
+    Tests the validation service
+    """
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.spool = os.path.join(self.directory.name, "spool")
+        self.paths = {}
+        for name, content in (("a.csv", "col1,col2\n1,2\n"), ("b.csv", "col1,col2\nthree,2\n")):
+            self.paths[name] = os.path.join(self.directory.name, name)
+            with open(self.paths[name], "w") as f:
+                f.write(content)
+        self.parser = "src.tests.test_base_parser:ExampleParser"
+        self.service = service.ValidationService(self.spool, [self.parser], workers=2, poll_interval=0.01)
+        self.thread = threading.Thread(target=self.service.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        self.service.stop()
+        self.thread.join()
+        self.directory.cleanup()
+
+    def test_jobs(self):
+        jobs = {name: service.submit(self.spool, self.parser, path) for name, path in self.paths.items()}
+        jobs["missing"] = service.submit(self.spool, "src.tests.test_base_parser:MissingParser", self.paths["a.csv"])
+        results = {name: service.result(self.spool, job_id, timeout=30) for name, job_id in jobs.items()}
+        self.assertEqual({name: job_result["status"] for name, job_result in results.items()},
+                         {"a.csv": "valid", "b.csv": "invalid", "missing": "error"})
+        self.assertEqual((results["b.csv"]["column"], results["b.csv"]["row"]), ("col1", 1))
+        self.assertEqual(os.listdir(os.path.join(self.spool, "processing")), [])
+
+        stats = self.service.stats()
+        self.assertEqual((stats["queue_depth"], stats["in_flight"], stats["completed"]), (0, 0, 3))
+        self.assertEqual(stats["parsers"][self.parser]["files"], 2)
+        self.assertIsNotNone(stats["latency_seconds"]["p99"])
+
+    def test_recover(self):
+        self.service.stop()
+        self.thread.join()
+        job_id = service.submit(self.spool, self.parser, self.paths["a.csv"])
+        os.replace(os.path.join(self.spool, "incoming", job_id + ".json"),
+                   os.path.join(self.spool, "processing", job_id + ".json"))
+        self.service = service.ValidationService(self.spool, workers=1, poll_interval=0.01)
+        self.thread = threading.Thread(target=self.service.serve_forever)
+        self.thread.start()
+        self.assertEqual(service.result(self.spool, job_id, timeout=30)["status"], "valid")
+
+    def test_recover_running_service(self):
+        """
+        test that only the jobs of services that are not running anymore are moved back to incoming
+
+        :return:
+        """
+        self.service.stop()
+        self.thread.join()
+        dead = subprocess.Popen([sys.executable, "-c", ""])
+        dead.wait()
+        job_ids = {}
+        for owner in (dead.pid, os.getppid()):
+            job_ids[owner] = service.submit(self.spool, self.parser, self.paths["a.csv"])
+            os.replace(os.path.join(self.spool, "incoming", job_ids[owner] + ".json"),
+                       os.path.join(self.spool, "processing", "{}@{}.json".format(job_ids[owner], owner)))
+        self.service = service.ValidationService(self.spool, workers=1, poll_interval=0.01)
+        self.thread = threading.Thread(target=self.service.serve_forever)
+        self.thread.start()
+        self.assertEqual(service.result(self.spool, job_ids[dead.pid], timeout=30)["status"], "valid")
+        self.assertEqual(os.listdir(os.path.join(self.spool, "processing")),
+                         ["{}@{}.json".format(job_ids[os.getppid()], os.getppid())])
+
+    def test_complete_requeued(self):
+        """
+        test that a job whose processing file is gone is still completed and leaves in_flight
+
+        :return:
+        """
+        job = {"id": "gone", "parser": self.parser, "path": self.paths["a.csv"], "submitted": None}
+        with self.service.lock:
+            self.service.in_flight.add(job["id"])
+        self.service.complete(job, {"path": job["path"], "status": "valid"}, 0.0)
+        self.assertNotIn(job["id"], self.service.in_flight)
+        self.assertEqual(service.result(self.spool, job["id"], timeout=30)["status"], "valid")
+
+    def test_worker_died(self):
+        """
+        test that the job of a dying worker fails and the pool is started again for the next jobs
+
+        :return:
+        """
+        crash = os.path.join(self.directory.name, "crash.csv")
+        with open(crash, "w") as f:
+            f.write("col1,col2\n1,2\n")
+        job_id = service.submit(self.spool, "src.tests.test_cli:CrashingParser", crash)
+        job_result = service.result(self.spool, job_id, timeout=30)
+        self.assertEqual(job_result["status"], "error")
+        self.assertIn("BrokenProcessPool", job_result["message"])
+        job_id = service.submit(self.spool, self.parser, self.paths["a.csv"])
+        self.assertEqual(service.result(self.spool, job_id, timeout=30)["status"], "valid")
+
+    def test_slow_job_beside_dying_worker(self):
+        """
+        test that a job in flight when another worker dies is validated again and not reported as an error
+
+        :return:
+        """
+        jobs = {}
+        for name in ("slow.csv", "crash.csv"):
+            path = os.path.join(self.directory.name, name)
+            with open(path, "w") as f:
+                f.write("col1,col2\n1,2\n")
+            jobs[name] = service.submit(self.spool, "src.tests.test_cli:CrashingParser", path)
+        results = {name: service.result(self.spool, job_id, timeout=30) for name, job_id in jobs.items()}
+        self.assertEqual({name: job_result["status"] for name, job_result in results.items()},
+                         {"slow.csv": "valid", "crash.csv": "error"})
+        self.assertIn("BrokenProcessPool", results["crash.csv"]["message"])
+        self.assertEqual(self.service.suspects, set())
+
+    def test_percentile(self):
+        self.assertIsNone(service.percentile([], 50))
+        self.assertEqual(service.percentile(list(range(1, 101)), 90), 90)
+        self.assertEqual(service.percentile([3.0], 99), 3.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
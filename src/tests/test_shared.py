@@ -0,0 +1,104 @@
+import asyncio
+import errno
+import os
+import tempfile
+import unittest
+from unittest import mock
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from src.validpanda.block import Block
+from src.validpanda.exceptions import ValidationError
+from src.validpanda.file import File
+from src.validpanda.sampling import Sampling
+from src.validpanda.spreadsheet import Spreadsheet
+from src.validpanda.shared import SharedFrame, share
+
+
+def shared_files():
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return {f for f in os.listdir(directory) if f.startswith("validpanda_")}
+
+
+class TestShared(unittest.TestCase):
+    """
+    Tests the SharedFrame class
+    """
+    def setUp(self):
+        self.dataframe = pd.DataFrame({"numbers": np.arange(1000).astype(str),
+                                       "values": ["a", None, "b", "c"] * 250,
+                                       "mixed": ["a", 1, np.nan, "b"] * 250}, dtype=object)
+
+    def test_attach(self):
+        """
+        test that string columns are written as arrow buffers and come back as the same 'object' columns
+
+        :return:
+        """
+        with SharedFrame(self.dataframe) as shared:
+            self.assertEqual([column[0] for column in shared.columns], ["arrow", "arrow", "pickle"])
+            attached = shared.attach()
+            pd.testing.assert_frame_equal(attached, self.dataframe)
+            self.assertIsNone(attached.loc[1, "values"])
+        numbers = pd.DataFrame({"numbers": np.arange(1000, dtype="int64")})
+        with SharedFrame(numbers) as shared:
+            # numeric columns point into the mapping
+            self.assertFalse(shared.attach()["numbers"].to_numpy().flags.writeable)
+
+    def test_no_space(self):
+        """
+        test that a dataframe is passed as it is if there is no space left for the file
+
+        :return:
+        """
+        before = shared_files()
+        with mock.patch.object(SharedFrame, "write", side_effect=OSError(errno.ENOSPC, "No space left on device")):
+            self.assertIs(share(self.dataframe), self.dataframe)
+        self.assertEqual(shared_files(), before)
+        with mock.patch.object(SharedFrame, "write", side_effect=OSError(errno.EACCES, "Permission denied")):
+            self.assertRaises(OSError, share, self.dataframe)
+
+    def test_cleanup(self):
+        with self.assertRaises(ValueError):
+            with SharedFrame(self.dataframe) as shared:
+                raise ValueError
+        self.assertFalse(os.path.exists(shared.path))
+
+    def test_process_executor(self):
+        block = Block()
+        block.columns_names = OrderedDict([("numbers", (None, "int64")),
+                                           ("values", (None, "object")),
+                                           ("mixed", (None, "object"))])
+        spreadsheet = Spreadsheet()
+        spreadsheet.blocks_allocation = {0: {"coordinates": (None, None), "block": block}}
+        file = File()
+        file.spreadsheets = {0: {"name": "Sheet1", "spreadsheet": spreadsheet},
+                             1: {"name": "Sheet2", "spreadsheet": spreadsheet}}
+        sheet = pd.concat([pd.DataFrame([list(self.dataframe.columns)], dtype=object),
+                           pd.DataFrame(self.dataframe.to_numpy(), dtype=object)],
+                          ignore_index=True)
+        invalid = sheet.copy()
+        invalid.loc[7, 0] = "x"
+        before = shared_files()
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            file.data = (sheet, sheet)
+            self.assertTrue(asyncio.run(file.ais_valid(executor=executor)))
+            file.data = (sheet, invalid)
+            with self.assertRaises(ValidationError) as context:
+                asyncio.run(file.ais_valid(executor=executor))
+            self.assertEqual((context.exception.sheet, context.exception.row), ("Sheet2", 7))
+            # the report entries of the workers end up in the sampling of the caller
+            file.data = (sheet, sheet)
+            sampling = Sampling(size=100, seed=1)
+            self.assertTrue(asyncio.run(file.ais_valid(executor=executor, sampling=sampling)))
+            self.assertEqual([entry["sampled"] for entry in sampling.report], [100, 100])
+            self.assertAlmostEqual(sampling.invalid_fraction_bound, 0.03)
+            with mock.patch.object(SharedFrame, "write", side_effect=OSError(errno.ENOSPC, "No space left on device")):
+                file.data = (sheet, sheet)
+                self.assertTrue(asyncio.run(file.ais_valid(executor=executor)))
+        self.assertEqual(shared_files(), before)
+
+
+if __name__ == '__main__':
+    unittest.main()
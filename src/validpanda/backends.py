@@ -0,0 +1,338 @@
+"""
+Backends
+--------
+
+Defines the dataframe backends of the validpanda package. The same Blocks, Spreadsheets and Files validate pandas and
+polars dataframes, the backend is chosen by the type of the dataframe.
+
+A polars spreadsheet is expected the same way as a pandas one, without a header and with every value as a string,
+for example
+
+>>> import polars as pl
+>>> file.data = (pl.read_csv("sheet.csv", has_header=False, infer_schema=False),)
+>>> file.is_valid()
+True
+
+With polars the functions, regular expressions and datatype conversions of all columns of a block are evaluated as
+one lazy query, which runs multithreaded in the polars engine, so *Block.partitions* is not needed. Sampling, memory
+budgets, streaming and export are only supported by the pandas backend.
+
+Neither pandas nor polars is imported by this module, they are imported when the first dataframe is validated.
+"""
+import re
+import warnings
+from .compiled import RegexChecker
+from .exceptions import ValidationError
+
+
+class PandasBackend:
+    """
+    operations on pandas dataframes with 'object' columns
+    """
+
+    name = "pandas"
+
+    @staticmethod
+    def check_types(dataframe, indx):
+        """
+        checks that a spreadsheet is a dataframe with 'object' datatype only
+
+        :param dataframe: spreadsheet
+        :param indx: id of the spreadsheet
+        :return: None
+        """
+        import pandas as pd
+        assert(isinstance(dataframe, pd.DataFrame)), \
+            "{} entry in data tuple is not a dataframe, but {}".format(indx, type(dataframe))
+
+        for col_indx, col_dtype in enumerate(dataframe.dtypes):
+            assert(pd.api.types.is_object_dtype(col_dtype)), \
+                "validpanda only accepts 'object' datatypes on columns, not {} in col number {}".format(col_dtype,
+                                                                                                        col_indx)
+
+    @staticmethod
+    def is_frame(dataframe):
+        import pandas as pd
+        return isinstance(dataframe, pd.DataFrame)
+
+    @staticmethod
+    def shape(dataframe):
+        return dataframe.shape
+
+    @staticmethod
+    def columns(dataframe):
+        return list(dataframe.columns)
+
+    @staticmethod
+    def row(dataframe, position):
+        """
+        :return: numpy array with the values of a row
+        """
+        return dataframe.iloc[position].to_numpy()
+
+    @staticmethod
+    def column(dataframe, position):
+        """
+        :return: numpy array with the values of a column
+        """
+        return dataframe.iloc[:, position].to_numpy()
+
+    @staticmethod
+    def slice(dataframe, row_start, row_stop=None, col_start=0, col_stop=None):
+        """
+        cuts a part of the dataframe by position, stops are exclusive and None means until the end
+
+        :return: dataframe with a fresh index, the column labels are kept
+        """
+        return dataframe.iloc[row_start:row_stop, col_start:col_stop].reset_index(drop=True)
+
+    @staticmethod
+    def content(dataframe):
+        """
+        :return: dataframe without the first row, the index is kept so that it still numbers the rows of the block
+        """
+        return dataframe.iloc[1:]
+
+    @staticmethod
+    def find_row(dataframe, values):
+        """
+        finds the first row that starts with the given values
+
+        :param dataframe: dataframe
+        :param values: tuple of values
+        :return: position of the row, None if there is no such row
+        """
+        if dataframe.shape[1] < len(values):
+            return None
+        found = dataframe.iloc[:, :len(values)].eq(list(values)).all(axis=1).to_numpy().nonzero()[0]
+        return int(found[0]) if len(found) else None
+
+
+class PolarsBackend:
+    """
+    operations on polars dataframes with string columns
+    """
+
+    name = "polars"
+
+    casts = {"int8": "Int8", "int16": "Int16", "int32": "Int32", "int64": "Int64", "int": "Int64",
+             "uint8": "UInt8", "uint16": "UInt16", "uint32": "UInt32", "uint64": "UInt64",
+             "float32": "Float32", "float64": "Float64", "float": "Float64",
+             "category": "Categorical"}
+    """pandas datatypes and the polars datatypes they are cast to. Datetimes are parsed far more permissively by
+    pandas, they are checked with the pandas checker."""
+
+    @staticmethod
+    def check_types(dataframe, indx):
+        pl = import_polars()
+        assert(isinstance(dataframe, pl.DataFrame)), \
+            "{} entry in data tuple is not a dataframe, but {}".format(indx, type(dataframe))
+        for col_indx, col_dtype in enumerate(dataframe.dtypes):
+            assert(col_dtype in (pl.String, pl.Null)), \
+                "validpanda only accepts string datatypes on polars columns, not {} in col number {}".format(col_dtype,
+                                                                                                          col_indx)
+
+    @staticmethod
+    def is_frame(dataframe):
+        return isinstance(dataframe, import_polars().DataFrame)
+
+    @staticmethod
+    def shape(dataframe):
+        return dataframe.shape
+
+    @staticmethod
+    def columns(dataframe):
+        return list(dataframe.columns)
+
+    @staticmethod
+    def row(dataframe, position):
+        return dataframe.row(position)
+
+    @staticmethod
+    def column(dataframe, position):
+        return dataframe.to_series(position).to_numpy()
+
+    @staticmethod
+    def slice(dataframe, row_start, row_stop=None, col_start=0, col_stop=None):
+        length = None if row_stop is None else max(0, row_stop - row_start)
+        return dataframe.slice(row_start, length).select(dataframe.columns[col_start:col_stop])
+
+    @staticmethod
+    def content(dataframe):
+        return dataframe.slice(1)
+
+    @staticmethod
+    def find_row(dataframe, values):
+        pl = import_polars()
+        if dataframe.width < len(values):
+            return None
+        condition = pl.all_horizontal([pl.col(column) == value if value is not None else pl.col(column).is_null()
+                                       for column, value in zip(dataframe.columns, values)])
+        found = dataframe.lazy().with_row_index("position").filter(condition).select("position").head(1).collect()
+        return found.item() if found.height else None
+
+    def check_content(self, block, dataframe, dataframe_header_dict, columns, first_row=0):
+        """
+        validates all columns of a block content in one lazy query and raises the failure of the first failing
+        column in *columns*, like :meth:`validpanda.block.Block.check_content`.
+
+        :param block: Block
+        :param dataframe: polars dataframe without the header
+        :param dataframe_header_dict: dict that maps the dataframe columns to the names of the columns in the block
+        :param columns: dataframe columns in the order to validate
+        :param first_row: row number of the first row of the dataframe inside of the block
+        :return: Boolean
+        """
+        pl = import_polars()
+        checkers = block.compiled.checkers
+        failures = []
+        for column in columns:
+            function_to_apply, checker = checkers[dataframe_header_dict[column]]
+            failures.append(self.failure_expression(pl.col(column), function_to_apply, checker).alias(column))
+        failed = dataframe.lazy().select(failures).collect()
+        for column in columns:
+            positions = failed.get_column(column).arg_true()
+            if positions.len():
+                function_to_apply, checker = checkers[dataframe_header_dict[column]]
+                if self.is_cast(function_to_apply, checker):
+                    # polars rejects some values that pandas converts (e.g. "1_000"), pandas decides on those.
+                    # Missing values are NaN in a pandas spreadsheet
+                    values = [float("nan") if value is None else value
+                              for value in dataframe.get_column(column).gather(positions).to_list()]
+                    position = first_failure(values, checker, index=positions.to_list())
+                    if position is None:
+                        continue
+                else:
+                    position = positions[0]
+                row = first_row + position
+                raise ValidationError(checker.message(dataframe_header_dict[column], column, block.name, row),
+                                      block=block.name,
+                                      column=dataframe_header_dict[column],
+                                      column_index=column,
+                                      row=row)
+        return True
+
+    def failure_expression(self, expression, function_to_apply, checker):
+        """
+        builds a boolean expression that is true for every value that fails the checker
+
+        :param expression: polars expression of the column
+        :param function_to_apply: function to apply first or None
+        :param checker: RegexChecker or DtypeChecker
+        :return: polars expression
+        """
+        pl = import_polars()
+        if function_to_apply is not None:
+            with warnings.catch_warnings():
+                # the function is part of the schema, there is no native expression to suggest
+                warnings.simplefilter("ignore", pl.exceptions.PolarsInefficientMapWarning)
+                expression = expression.map_elements(function_to_apply, return_dtype=pl.Object, skip_nulls=False)
+            # functions may return anything, check the results with pandas semantics
+            return expression.map_batches(lambda s: pl.Series(failures(s.to_list(), checker)),
+                                          return_dtype=pl.Boolean)
+        if isinstance(checker, RegexChecker):
+            try:
+                pattern = rust_pattern(checker.pattern)
+                # this only checks if the pattern compiles in the rust regex engine
+                pl.select(pl.lit("").str.contains(pattern))
+            except Exception:
+                return expression.map_batches(lambda s: pl.Series(failures(s.to_list(), checker)),
+                                              return_dtype=pl.Boolean)
+            # None does not match, like NaN with pandas
+            return expression.str.contains(pattern).fill_null(False).not_()
+        if self.is_cast(function_to_apply, checker):
+            dtype = self.casts[str(checker.dtype)]
+            # python strips this whitespace around numbers
+            cast = expression.str.strip_chars(" \t\n\r\x0b\x0c").cast(getattr(pl, dtype), strict=False)
+            failed = cast.is_null() & expression.is_not_null()
+            if dtype.startswith(("Int", "UInt")):
+                # pandas can not convert missing values to integers
+                failed = failed | expression.is_null()
+            return failed
+        if str(checker.dtype) in ("object", "str", "string"):
+            # every value is an object
+            return expression.is_null() & pl.lit(False)
+        return expression.map_batches(lambda s: pl.Series(failures(s.to_list(), checker)),
+                                      return_dtype=pl.Boolean)
+
+    def is_cast(self, function_to_apply, checker):
+        """
+        :param function_to_apply: function to apply first or None
+        :param checker: RegexChecker or DtypeChecker
+        :return: whether the column is checked with a polars cast, whose failures must be confirmed by pandas
+        """
+        return function_to_apply is None and not isinstance(checker, RegexChecker) and str(checker.dtype) in self.casts
+
+
+def first_failure(values, checker, index=None):
+    """
+    checks values with the pandas checker, for what polars can not express
+
+    :param values: list of values
+    :param checker: RegexChecker or DtypeChecker
+    :param index: positions of the values, 0 to len(values) if None
+    :return: position of the first failure, None if all values pass
+    """
+    import pandas as pd
+    return checker.first_failure(pd.Series(values, index=index, dtype=object))
+
+
+def failures(values, checker):
+    """
+    checks values with the pandas checker. Only the first failure is needed, so only that one is marked.
+
+    :param values: list of values
+    :param checker: RegexChecker or DtypeChecker
+    :return: list of booleans
+    """
+    marked = [False] * len(values)
+    row = first_failure(values, checker)
+    if row is not None:
+        marked[row] = True
+    return marked
+
+
+def rust_pattern(pattern):
+    """
+    translates a python regular expression used with re.match (anchored at the start) for the polars regex engine.
+    Raises ValueError for what the translation can not express: flags other than IGNORECASE and "$", which python
+    also matches before a newline at the end.
+
+    :param pattern: compiled python regular expression
+    :return: str
+    """
+    if pattern.flags & ~(re.IGNORECASE | re.UNICODE) or "$" in pattern.pattern:
+        raise ValueError("{} has no equivalent in the rust regex engine".format(pattern))
+    flags = "(?i)" if pattern.flags & re.IGNORECASE else ""
+    return flags + "^(?:" + pattern.pattern + ")"
+
+
+def import_polars():
+    """
+    imports polars, which is an optional dependency
+
+    :return: polars module
+    """
+    try:
+        import polars
+    except ImportError:
+        raise ImportError("the polars backend requires polars, install it with 'pip install validpanda[polars]'")
+    return polars
+
+
+PANDAS = PandasBackend()
+"""the pandas backend"""
+POLARS = PolarsBackend()
+"""the polars backend"""
+
+
+def get_backend(dataframe):
+    """
+    chooses the backend by the type of a dataframe, without importing polars for pandas dataframes
+
+    :param dataframe: pandas or polars dataframe
+    :return: PandasBackend or PolarsBackend
+    """
+    if type(dataframe).__module__.split(".")[0] == "polars":
+        return POLARS
+    return PANDAS
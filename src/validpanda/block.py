@@ -5,7 +5,11 @@ Block
 Defines *Block* class of the validpanda package
 """
 import collections
-import re
+import contextlib
+import time
+from .backends import get_backend, PANDAS
+from .compiled import CompiledBlock
+from .exceptions import ValidationError
 from .helpers import Helper
 
 
@@ -68,6 +72,20 @@ class Block:
         """calculated amount of rows in particular dataframe for this Block instance"""
         self.calculated_col_length = None
         """calculated amount of columns in particular dataframe for this Block instance"""
+        self.partitions = 1
+        """amount of row partitions the content is validated in parallel, 1 means no partitioning. Only used by the
+        pandas backend, polars is multithreaded on its own"""
+        self.partition_executor = "process"
+        """pool to validate partitions in, either "process" or "thread" for functions that release the GIL"""
+        self.header_normalization = ("strip",)
+        """steps applied to the header cells before they are compared to the column names, some of "strip",
+        "casefold" and "collapse_whitespace". The header of the next block below is still found by its exact names."""
+
+    def __setattr__(self, name, value):
+        if name in ("columns_names", "header_normalization"):
+            # the compiled block depends on these two, it is looked up again on the next access
+            self.__dict__["_compiled"] = None
+        super().__setattr__(name, value)
 
     def __str__(self):
         return self.name
@@ -87,64 +105,279 @@ class Block:
         """
         return self.columns_names.keys()
 
-    def is_valid(self, dataframe):
+    @property
+    def compiled(self):
+        """
+        the :class:`validpanda.compiled.CompiledBlock` of *columns_names* and *header_normalization*, shared by all
+        blocks with the same definition. It is kept on the block until one of the two is assigned again, so
+        *columns_names* must not be changed in place.
+
+        :return: CompiledBlock
+        """
+        compiled = self.__dict__.get("_compiled")
+        if compiled is None:
+            compiled = self.__dict__["_compiled"] = CompiledBlock.get(self.columns_names, self.header_normalization)
+        return compiled
+
+    def is_valid(self, dataframe, sampling=None, cost_model=None, memory_budget=None):
         """
         core method to validate whether a given dataframe matches this block
 
         .. warning::
            Important the dataframe is expected with header being the first row
 
+        .. note::
+           if *partitions* is bigger than 1, the content rows are split into that many partitions that are validated
+           in a pool of processes (or threads if *partition_executor* is "thread"). A process pool needs all
+           functions in *columns_names* to be picklable, so lambdas only work with threads.
+
         :param dataframe: pandas dataframe to be validated.
+        :param sampling: optional :class:`validpanda.sampling.Sampling`, validates the values only on a sample of rows
+        :param cost_model: optional :class:`validpanda.costs.CostModel`, validates the cheapest columns first
+        :param memory_budget: optional :class:`validpanda.memory.MemoryBudget`
         :return: Boolean
         """
-        assert(isinstance(self.columns_names, collections.OrderedDict)), \
-            "Block.columns_names must be {}, not {}".format(collections.OrderedDict, type(self.columns_names))
+        dataframe, dataframe_header_dict = self.check_header(dataframe)
+        return self.is_valid_content(dataframe, dataframe_header_dict,
+                                     sampling=sampling,
+                                     cost_model=cost_model,
+                                     memory_budget=memory_budget)
+
+    def is_valid_content(self, dataframe, dataframe_header_dict, sampling=None, cost_model=None, memory_budget=None):
+        """
+        validates the content of this block, whose header was already checked by :meth:`check_header`
+
+        :param dataframe: pandas dataframe without the header
+        :param dataframe_header_dict: dict that maps the dataframe columns to the names of the columns in this block
+        :param sampling: optional :class:`validpanda.sampling.Sampling`, validates the values only on a sample of rows
+        :param cost_model: optional :class:`validpanda.costs.CostModel`, validates the cheapest columns first
+        :param memory_budget: optional :class:`validpanda.memory.MemoryBudget`. The content is validated without
+                              partitions, in row chunks if the columns do not fit into the budget at once.
+        :return: Boolean
+        """
+        backend = get_backend(dataframe)
+        if backend is not PANDAS:
+            if sampling is not None or memory_budget is not None:
+                raise NotImplementedError("sampling and memory budgets are only supported by the pandas backend")
+            # header blocks number the rows of their content from 1, see check_header
+            return backend.check_content(self, dataframe, dataframe_header_dict,
+                                         self.columns_order(dataframe, dataframe_header_dict, cost_model),
+                                         first_row=1 if self.header else 0)
+        if sampling is not None:
+            dataframe = sampling.take(dataframe, self)
+        if memory_budget is not None:
+            chunk_rows = memory_budget.chunk_rows(dataframe, functions=self.compiled.functions)
+            if chunk_rows is None:
+                self.check_content(dataframe, dataframe_header_dict, cost_model=cost_model, memory_budget=memory_budget)
+            else:
+                self.check_chunks(dataframe, dataframe_header_dict, chunk_rows,
+                                  cost_model=cost_model,
+                                  memory_budget=memory_budget)
+        elif self.partitions > 1 and dataframe.shape[0] > self.partitions:
+            self.check_partitions(dataframe, dataframe_header_dict, cost_model=cost_model)
+        else:
+            self.check_content(dataframe, dataframe_header_dict, cost_model=cost_model)
+        return True
+
+    def check_header(self, dataframe):
+        """
+        checks the header of the dataframe and splits it from the content.
+
+        :param dataframe: pandas dataframe with header being the first row
+        :return: content dataframe, dict that maps the dataframe columns to the names of the columns in this block
+        """
+        compiled = self.compiled
+        backend = get_backend(dataframe)
         # first check if there is a pattern in the header
         if self.header:
-            # grab the first row for the header
-            dataframe_header = tuple(map(lambda c: c.strip(), dataframe.iloc[0]))
+            if backend.shape(dataframe)[0] == 0:
+                raise ValidationError("Block {} has no header row, it starts outside of the spreadsheet".format(self.name),
+                                      block=self.name,
+                                      row=0)
+            # normalize the whole header row at once
+            dataframe_header = compiled.normalize_header(backend.row(dataframe, 0))
             # new df without first row
-            dataframe = dataframe.iloc[1:]
-            # create dict to be able to look up things later
-            dataframe_header_dict = dict(zip(dataframe.columns, dataframe_header))
+            dataframe = backend.content(dataframe)
+            columns = backend.columns(dataframe)
             if self.header_pattern:
-                pattern = tuple(self.columns)
                 # look for pattern
-                col_length = Helper.find_pattern(dataframe_header, pattern)
-                assert(col_length == len(dataframe.columns)), "Block {}, pattern does not fit into the dataframe header".format(self.name)
-
+                col_length = compiled.pattern_length(dataframe_header)
+                if col_length != len(columns):
+                    raise ValidationError("Block {}, pattern does not fit into the dataframe header, it stops at "
+                                          "column {} of {}".format(self.name, col_length, len(columns)),
+                                          block=self.name,
+                                          column_index=columns[col_length],
+                                          row=0)
+                header = compiled.header * (len(columns) // len(compiled.header))
+            elif not compiled.header_matches(dataframe_header):
+                raise ValidationError("Block {}. Header column names do not match or are in wrong order.\n\n "
+                                      "dataframe header:\n {} \n\n columns:\n{}".format(self.name,
+                                                                                       "|".join(dataframe_header),
+                                                                                       "|".join(compiled.header)),
+                                      block=self.name,
+                                      row=0)
             else:
-                assert(dataframe_header == tuple(self.columns)), \
-                    "Block {}. Header column names do not match or are in wrong order.\n\n dataframe header:\n {} \n\n columns:\n{}".format(self.name,
-                                                                                                                                            "|".join(dataframe_header),
-                                                                                                                                            "|".join(tuple(self.columns)))
+                header = compiled.header
+            # create dict to be able to look up things later, the names are the ones of the block
+            dataframe_header_dict = dict(zip(columns, header))
         else:
-            dataframe_header_dict = dict(zip(dataframe.columns, self.columns_names.keys()))  # map to itself
+            dataframe_header_dict = dict(zip(backend.columns(dataframe), compiled.header))  # map to itself
+        return dataframe, dataframe_header_dict
+
+    def check_content(self, dataframe, dataframe_header_dict, cost_model=None, columns=None, memory_budget=None):
+        """
+        checks that the values of every column can be converted to its datatype or match its regular expression.
+        Stops at the first failing column.
 
-        for column_indx in dataframe.columns:
-            function_to_apply, dtype = self.columns_names[dataframe_header_dict[column_indx]]
+        :param dataframe: pandas dataframe without the header
+        :param dataframe_header_dict: dict that maps the dataframe columns to the names of the columns in this block
+        :param cost_model: optional :class:`validpanda.costs.CostModel`. Columns are validated from the cheapest to the
+                           most expensive one and the timings are recorded in the model.
+        :param columns: dataframe columns in the order to validate, :meth:`columns_order` if None
+        :param memory_budget: optional :class:`validpanda.memory.MemoryBudget`, charged with the converted column
+        :return: Boolean
+        """
+        if columns is None:
+            columns = self.columns_order(dataframe, dataframe_header_dict, cost_model)
+        if memory_budget is not None:
+            column_bytes = memory_budget.charge("column",
+                                                memory_budget.column_size(dataframe, functions=self.compiled.functions))
+            try:
+                return self.check_content(dataframe, dataframe_header_dict, cost_model=cost_model, columns=columns)
+            finally:
+                memory_budget.release("column", column_bytes)
+        checkers = self.compiled.checkers
+        for column_indx in columns:
+            start = time.perf_counter()
+            function_to_apply, checker = checkers[dataframe_header_dict[column_indx]]
 
             if function_to_apply is not None:
                 # TODO use proper indexing. Pandas raises a warning.
                 dataframe[column_indx] = dataframe[column_indx].apply(function_to_apply)
 
-            if isinstance(dtype, type(re.compile("([0-9])+"))):
-                assert (set(dataframe[column_indx].str.match(dtype)) == {True}), \
-                    "one of the values in column {}, does not match the regular expression {} in block {}".format(dataframe_header_dict[column_indx],
-                                                                                                                  str(dtype),
-                                                                                                                  self.name)
-            else:
+            row = checker.first_failure(dataframe[column_indx])
+            if row is not None:
+                raise ValidationError(checker.message(dataframe_header_dict[column_indx], column_indx, self.name, row),
+                                      block=self.name,
+                                      column=dataframe_header_dict[column_indx],
+                                      column_index=column_indx,
+                                      row=row)
+            if cost_model is not None:
+                cost_model.record(self, dataframe_header_dict[column_indx], time.perf_counter() - start,
+                                  dataframe.shape[0])
+        return True
+
+    def check_chunks(self, dataframe, dataframe_header_dict, chunk_rows, cost_model=None, memory_budget=None):
+        """
+        validates the content in row chunks one after another, so that only one converted chunk is held at a time.
+        Raises the same failure as :meth:`check_content`: the first failing column and the first failing row in it.
+
+        :param dataframe: pandas dataframe without the header
+        :param dataframe_header_dict: dict that maps the dataframe columns to the names of the columns in this block
+        :param chunk_rows: amount of rows per chunk
+        :param cost_model: optional :class:`validpanda.costs.CostModel`, see :meth:`check_content`
+        :param memory_budget: optional :class:`validpanda.memory.MemoryBudget`
+        :return: Boolean
+        """
+        columns = self.columns_order(dataframe, dataframe_header_dict, cost_model)
+        failure = None
+        for start in range(0, dataframe.shape[0], chunk_rows):
+            if not columns:
+                break
+            try:
+                self.check_content(dataframe.iloc[start:start + chunk_rows].copy(), dataframe_header_dict,
+                                   cost_model=cost_model,
+                                   columns=columns,
+                                   memory_budget=memory_budget)
+            except ValidationError as e:
+                # later chunks only need to check the columns before the failing one
+                failure = e
+                columns = columns[:columns.index(e.column_index)]
+        if failure is not None:
+            raise failure
+        return True
+
+    def columns_order(self, dataframe, dataframe_header_dict, cost_model=None):
+        """
+        order in which the columns of the dataframe are validated
+
+        :param dataframe: pandas dataframe without the header
+        :param dataframe_header_dict: dict that maps the dataframe columns to the names of the columns in this block
+        :param cost_model: optional :class:`validpanda.costs.CostModel`, the columns are sorted by estimated cost
+        :return: list of dataframe columns
+        """
+        columns = get_backend(dataframe).columns(dataframe)
+        if cost_model is None:
+            return columns
+        # sorted is stable, so columns with the same cost keep their order
+        return sorted(columns, key=lambda c: cost_model.estimate(self, dataframe_header_dict[c]))
+
+    def check_partitions(self, dataframe, dataframe_header_dict, cost_model=None):
+        """
+        validates the content in *partitions* row partitions in parallel. The failures of all partitions are merged, so
+        that the same failure as in :meth:`check_content` is raised: the first failing column and the first failing row
+        in it.
+
+        :param dataframe: pandas dataframe without the header
+        :param dataframe_header_dict: dict that maps the dataframe columns to the names of the columns in this block
+        :param cost_model: optional :class:`validpanda.costs.CostModel`, see :meth:`check_content`. Timings are only
+                           recorded with threads.
+        :return: Boolean
+        """
+        # only imported when partitions are used, to keep the import of validpanda fast
+        import concurrent.futures
+        from .shared import SharedFrame, share
+
+        if self.partition_executor == "thread":
+            executor_class = concurrent.futures.ThreadPoolExecutor
+        elif self.partition_executor == "process":
+            executor_class = concurrent.futures.ProcessPoolExecutor
+        else:
+            raise ValueError("Block {}. partition_executor must be 'process' or 'thread', not {}".format(
+                self.name, self.partition_executor))
+
+        columns = self.columns_order(dataframe, dataframe_header_dict, cost_model)
+        failures = []
+        with contextlib.ExitStack() as shared, executor_class(max_workers=self.partitions) as executor:
+            partitions = [dataframe.iloc[start:stop].copy()
+                          for start, stop in Helper.partitions(dataframe.shape[0], self.partitions)]
+            if executor_class is concurrent.futures.ProcessPoolExecutor:
+                # the workers map the partitions instead of receiving them through a pipe
+                for position, partition in enumerate(partitions):
+                    partitions[position] = share(partition)
+                    if isinstance(partitions[position], SharedFrame):
+                        shared.enter_context(partitions[position])
+            futures = [executor.submit(check_partition,
+                                       self,
+                                       partition,
+                                       dataframe_header_dict,
+                                       cost_model,
+                                       columns)
+                       for partition in partitions]
+            for future in futures:
                 try:
-                    dataframe[column_indx].astype(dtype, copy=False)
-                except ValueError:
-                    raise AssertionError("column {} (index={}), can not be converted to type {} in block {}".format(dataframe_header_dict[column_indx],
-                                                                                                                    str(column_indx),
-                                                                                                                    str(dtype),
-                                                                                                                    self.name)
-
-                                         )
+                    future.result()
+                except ValidationError as e:
+                    failures.append(e)
+        if failures:
+            columns_order = {column_indx: position for position, column_indx in enumerate(columns)}
+            # each partition stops at its own first failing column, so the smallest column across all partitions
+            # is the one the serial validation would have stopped at. Partitions are in row order.
+            raise min(failures, key=lambda e: columns_order[e.column_index])
         return True
 
 
+def check_partition(block, dataframe, dataframe_header_dict, cost_model=None, columns=None):
+    """
+    validates one partition of a block content, see :meth:`Block.check_partitions`
+
+    :param block: Block
+    :param dataframe: pandas dataframe or :class:`validpanda.shared.SharedFrame`
+    :return: Boolean
+    """
+    from .shared import attach
+    return block.check_content(attach(dataframe), dataframe_header_dict, cost_model, columns)
+
+
 if __name__ == "__main__":
     print("import me")
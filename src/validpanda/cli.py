@@ -0,0 +1,255 @@
+"""
+Command line
+------------
+
+Defines the *validpanda* console command, a batch validator for many files
+
+>>> validpanda mypackage.parsers:ExampleParser data/ "archive/**/*.xlsx" --workers 8 --output results.jsonl
+
+Every file is validated by a parser in one of the worker processes and one json line is written per file:
+
+>>> {"path": "data/a.xlsx", "status": "invalid", "sheet": "Sheet1", "block": "block2", "column": "Total LC",
+...  "row": 14, "message": "...", "read_seconds": 0.8, "validate_seconds": 0.1}
+
+*status* is "valid", "invalid" or "error" (the file could not be read or validated at all, e.g. because it does not
+fit into *--memory-budget*). With a memory budget *peak_bytes* reports the peak memory of the validation. The paths of finished
+files are appended to a manifest (*<output>.manifest* by default), so an interrupted run started again with the same
+arguments skips them and appends to the output.
+"""
+import argparse
+import concurrent.futures
+import concurrent.futures.process
+import glob
+import importlib
+import itertools
+import json
+import os
+import sys
+import time
+from .memory import MemoryBudget
+
+worker_parser = None
+"""parser instance of a worker process"""
+worker_memory_limit = None
+"""memory budget in bytes of a worker process for one file"""
+
+
+def load_parser_class(parser_path):
+    """
+    imports a parser class
+
+    :param parser_path: "package.module:ClassName" or "package.module.ClassName"
+    :return: class
+    """
+    if ":" in parser_path:
+        module_name, class_name = parser_path.split(":", 1)
+    else:
+        module_name, _, class_name = parser_path.rpartition(".")
+    if not module_name:
+        raise ValueError("parser must be given as 'package.module:ClassName', not {}".format(parser_path))
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def find_files(paths):
+    """
+    expands directories (recursively) and glob patterns into a sorted list of files
+
+    :param paths: list of directories, files or glob patterns
+    :return: list of paths
+    """
+    files = set()
+    for path in paths:
+        if os.path.isdir(path):
+            path = os.path.join(path, "**", "*")
+        files.update(f for f in glob.glob(path, recursive=True) if os.path.isfile(f))
+    return sorted(files)
+
+
+def init_worker(parser_path, memory_limit=None):
+    """
+    creates the parser of a worker process once
+
+    :param parser_path: see :func:`load_parser_class`
+    :param memory_limit: memory budget in bytes for the validation of one file, None for no limit
+    :return: None
+    """
+    global worker_parser, worker_memory_limit
+    worker_parser = load_parser_class(parser_path)()
+    worker_memory_limit = memory_limit
+
+
+def validate_path(path):
+    """
+    validates one file with the parser of the worker process
+
+    :param path: path to the file
+    :return: dict, the json line of the file
+    """
+    return validate_file(worker_parser, path, worker_memory_limit)
+
+
+def validate_file(parser, path, memory_limit=None):
+    """
+    validates one file with a parser and catches every error
+
+    :param parser: parser instance
+    :param path: path to the file
+    :param memory_limit: memory budget in bytes, None for no limit
+    :return: dict, the json line of the file
+    """
+    result = new_result(path)
+    memory_budget = None if memory_limit is None else MemoryBudget(memory_limit)
+    start = time.perf_counter()
+    try:
+        parser.read(path)
+        result["read_seconds"] = time.perf_counter() - start
+        start = time.perf_counter()
+        if not parser.file.is_valid(memory_budget=memory_budget):
+            result["status"] = "invalid"
+    except AssertionError as e:
+        # ValidationError knows where the file failed, plain assertions only have a message
+        row = getattr(e, "row", None)
+        result.update(status="invalid",
+                      sheet=getattr(e, "sheet", None),
+                      block=getattr(e, "block", None),
+                      column=getattr(e, "column", None),
+                      row=None if row is None else int(row),
+                      message=str(e))
+    except Exception as e:
+        result.update(status="error", message="{}: {}".format(type(e).__name__, e))
+    if result["read_seconds"] is None:
+        result["read_seconds"] = time.perf_counter() - start
+    else:
+        result["validate_seconds"] = time.perf_counter() - start
+    if memory_budget is not None:
+        result["peak_bytes"] = memory_budget.peak
+    parser.file.data = tuple()
+    return result
+
+
+def new_result(path, status="valid", message=None):
+    """
+    :param path: path to the file
+    :param status: "valid", "invalid" or "error"
+    :param message: message of the error
+    :return: dict, the json line of a file without any details
+    """
+    return {"path": path, "status": status, "sheet": None, "block": None, "column": None, "row": None,
+            "message": message, "read_seconds": None, "validate_seconds": None, "peak_bytes": None}
+
+
+def validate_paths(parser_path, paths, workers, memory_limit, write):
+    """
+    validates files in a pool of worker processes, with only as many files submitted as there are workers, so that
+    the files in flight are known if a worker dies
+
+    :param parser_path: see :func:`load_parser_class`
+    :param paths: list of paths
+    :param workers: amount of worker processes
+    :param memory_limit: memory budget in bytes per file
+    :param write: function called with the result of every finished file
+    :return: paths that were not submitted and paths that were in flight when a worker died (the pool is broken then)
+    """
+    paths = iter(paths)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers,
+                                                initializer=init_worker,
+                                                initargs=(parser_path, memory_limit)) as executor:
+        in_flight = {executor.submit(validate_path, path): path for path in itertools.islice(paths, workers)}
+        while in_flight:
+            done, _ = concurrent.futures.wait(in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+            broken = False
+            for future in done:
+                try:
+                    write(future.result())
+                except concurrent.futures.process.BrokenProcessPool:
+                    broken = True
+                    continue
+                del in_flight[future]
+            if broken:
+                return list(paths), list(in_flight.values())
+            for path in itertools.islice(paths, len(done)):
+                in_flight[executor.submit(validate_path, path)] = path
+    return [], []
+
+
+def read_manifest(manifest_path):
+    """
+    :param manifest_path: path to the manifest
+    :return: set of finished paths
+    """
+    if not os.path.exists(manifest_path):
+        return set()
+    with open(manifest_path) as f:
+        return {line.rstrip("\n") for line in f if line.strip()}
+
+
+def run(parser_path, paths, workers=None, output="validpanda_results.jsonl", manifest=None, memory_limit=None):
+    """
+    validates all files and writes the results
+
+    :param parser_path: see :func:`load_parser_class`
+    :param paths: list of directories, files or glob patterns
+    :param workers: amount of worker processes, the number of cpus if None
+    :param output: path to the json lines output
+    :param manifest: path to the manifest, *<output>.manifest* if None
+    :param memory_limit: memory budget in bytes per file, see :class:`validpanda.memory.MemoryBudget`
+    :return: dict with the counts of every status
+    """
+    manifest = manifest or output + ".manifest"
+    finished = read_manifest(manifest)
+    files = [path for path in find_files(paths) if path not in finished]
+    counts = {"valid": 0, "invalid": 0, "error": 0}
+    start = time.perf_counter()
+    with open(output, "a") as output_file, open(manifest, "a") as manifest_file:
+        def write(result):
+            counts[result["status"]] += 1
+            output_file.write(json.dumps(result) + "\n")
+            output_file.flush()
+            # the manifest is written after the result, so a result is never lost
+            manifest_file.write(result["path"] + "\n")
+            manifest_file.flush()
+
+        remaining = files
+        while remaining:
+            remaining, crashed = validate_paths(parser_path, remaining, workers or os.cpu_count(), memory_limit, write)
+            # a worker died (e.g. killed by the OOM killer), the pool is started again. The files that were in flight
+            # are validated alone, so only the file that kills its worker is reported as an error and a resumed run
+            # does not hit it again
+            for path in crashed:
+                if validate_paths(parser_path, [path], 1, memory_limit, write)[1]:
+                    write(new_result(path, "error", "BrokenProcessPool: the worker process died while validating "
+                                                    "this file"))
+    seconds = time.perf_counter() - start
+    print("validated {} files in {:.1f} s ({:.1f} files/s): {} valid, {} invalid, {} errors, {} skipped".format(
+        len(files), seconds, len(files) / seconds if seconds else 0.0, counts["valid"], counts["invalid"],
+        counts["error"], len(finished)))
+    return counts
+
+
+def main(argv=None):
+    """
+    entry point of the *validpanda* console command
+
+    :param argv: command line arguments, sys.argv by default
+    :return: exit code, 0 if all files are valid
+    """
+    argument_parser = argparse.ArgumentParser(prog="validpanda", description="validate many files with a parser")
+    argument_parser.add_argument("parser", help="parser class, e.g. mypackage.parsers:ExampleParser")
+    argument_parser.add_argument("paths", nargs="+", help="files, directories or glob patterns")
+    argument_parser.add_argument("-w", "--workers", type=int, default=None,
+                                 help="amount of worker processes (default: number of cpus)")
+    argument_parser.add_argument("-o", "--output", default="validpanda_results.jsonl",
+                                 help="json lines file with one result per file")
+    argument_parser.add_argument("-m", "--manifest", default=None,
+                                 help="list of finished files to resume from (default: <output>.manifest)")
+    argument_parser.add_argument("--memory-budget", type=int, default=None,
+                                 help="memory budget in MB for the validation of one file")
+    arguments = argument_parser.parse_args(argv)
+    memory_limit = None if arguments.memory_budget is None else arguments.memory_budget * 1024 ** 2
+    counts = run(arguments.parser, arguments.paths, arguments.workers, arguments.output, arguments.manifest,
+                 memory_limit)
+    return 0 if counts["invalid"] == counts["error"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
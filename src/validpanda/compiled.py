@@ -0,0 +1,205 @@
+"""
+Compiled
+--------
+
+Defines *CompiledBlock* class of the validpanda package
+"""
+import collections
+import re
+
+HEADER_NORMALIZATIONS = {"strip": lambda header: header.str.strip(),
+                         "casefold": lambda header: header.str.casefold(),
+                         "collapse_whitespace": lambda header: header.str.replace(r"\s+", " ", regex=True)}
+"""steps that can be applied to the header cells before they are compared to the column names, each one is applied
+to all cells of a header row (a pandas Series of str) at once"""
+
+
+class RegexChecker:
+    """
+    checks that every value of a column matches a regular expression
+    """
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+        """compiled regular expression"""
+
+    def first_failure(self, series):
+        """
+        :param series: pandas series
+        :return: index of the first value that does not match, None if all values match
+        """
+        matches = series.str.match(self.pattern)
+        if set(matches) == {True}:
+            return None
+        return matches.index[matches.ne(True).values][0]  # NaN counts as a failure too
+
+    def message(self, column_name, column_indx, block_name, row):
+        """
+        :return: message of the ValidationError
+        """
+        return "one of the values in column {}, does not match the regular expression {} in block {} (row {})".format(
+            column_name, str(self.pattern), block_name, row)
+
+
+class DtypeChecker:
+    """
+    checks that a column can be converted to a datatype
+    """
+
+    def __init__(self, dtype):
+        self.dtype = dtype
+        """datatype"""
+
+    def first_failure(self, series):
+        """
+        :param series: pandas series
+        :return: index of the first value that can not be converted, None if the column can be converted
+        """
+        try:
+            series.astype(self.dtype)
+        except ValueError:
+            # bisect, so only a logarithmic amount of conversions is needed
+            while series.shape[0] > 1:
+                half = series.iloc[:series.shape[0] // 2]
+                try:
+                    half.astype(self.dtype)
+                except ValueError:
+                    series = half
+                else:
+                    series = series.iloc[series.shape[0] // 2:]
+            return series.index[0]
+        return None
+
+    def message(self, column_name, column_indx, block_name, row):
+        """
+        :return: message of the ValidationError
+        """
+        return "column {} (index={}), can not be converted to type {} in block {} (row {})".format(
+            column_name, str(column_indx), str(self.dtype), block_name, row)
+
+
+class CompiledBlock:
+    """
+    Everything a Block needs for validation that depends only on its *columns_names*: the header tuple and a
+    checker object per column. One Block definition is often placed at many coordinates, so compiled blocks are
+    cached by their definition and shared by all Block instances with the same *columns_names*.
+
+    >>> compiled = CompiledBlock.get(block.columns_names)
+    >>> compiled.header
+    ('first_column_name', 'second_column_name')
+
+    Header cells are normalized with the steps of *header_normalization* (see *HEADER_NORMALIZATIONS*) before they
+    are compared. The column names are normalized once here, the header row of a dataframe with one vectorized
+    string operation per step:
+
+    >>> compiled = CompiledBlock.get(block.columns_names, ("strip", "casefold"))
+    >>> compiled.normalize_header((" First_Column_Name", None))
+    array(['first_column_name', ''], dtype=object)
+    """
+
+    cache = dict()
+    """compiled blocks by definition"""
+
+    def __init__(self, columns_names, header_normalization=("strip",)):
+        assert(isinstance(columns_names, collections.OrderedDict)), \
+            "Block.columns_names must be {}, not {}".format(collections.OrderedDict, type(columns_names))
+        assert(all(step in HEADER_NORMALIZATIONS for step in header_normalization)), \
+            "header_normalization steps must be some of {}, not {}".format(tuple(HEADER_NORMALIZATIONS),
+                                                                           header_normalization)
+        self.header = tuple(columns_names)
+        """names of the columns"""
+        self.header_normalization = tuple(header_normalization)
+        """normalization steps applied to the header cells"""
+        self.normalized_header = tuple(self.normalize(self.header))
+        """normalized names of the columns, what the normalized header cells are compared to"""
+        self.checkers = dict()
+        """function to apply and checker for every column name"""
+        for column_name, (function_to_apply, dtype) in columns_names.items():
+            if isinstance(dtype, type(re.compile("([0-9])+"))):
+                checker = RegexChecker(dtype)
+            else:
+                checker = DtypeChecker(dtype)
+            self.checkers[column_name] = (function_to_apply, checker)
+        self.functions = any(function_to_apply is not None for function_to_apply, _ in self.checkers.values())
+        """whether a function is applied to any column"""
+
+    def normalize(self, values):
+        """
+        normalizes header cells with one vectorized string operation per step. Missing cells become an empty string,
+        other cells that are not strings their str.
+
+        :param values: header cells
+        :return: numpy array of str
+        """
+        import pandas as pd
+        header = pd.Series(values, dtype="str")
+        for step in self.header_normalization:
+            header = HEADER_NORMALIZATIONS[step](header)
+        # the string operations keep missing cells missing
+        return header.to_numpy(dtype=object, na_value="")
+
+    def normalize_header(self, values):
+        """
+        normalizes a header row, see :meth:`normalize`. Usually most cells are the normalized column names already,
+        normalizing them again would not change them, so only the other cells are normalized.
+
+        :param values: header cells
+        :return: numpy array of str
+        """
+        import numpy as np
+        header = np.array(values, dtype=object)
+        try:
+            # the column names repeated over the whole row, for header patterns
+            todo = header != np.resize(np.asarray(self.normalized_header, dtype=object), len(header))
+        except TypeError:
+            # pd.NA can not be compared
+            todo = np.ones(len(header), dtype=bool)
+        if todo.any():
+            header[todo] = self.normalize(header[todo])
+        return header
+
+    def header_matches(self, header):
+        """
+        :param header: normalized header row, see :meth:`normalize_header`
+        :return: True if it is the header of the block
+        """
+        import numpy as np
+        return len(header) == len(self.normalized_header) and \
+            bool((header == np.asarray(self.normalized_header, dtype=object)).all())
+
+    def pattern_length(self, header):
+        """
+        amount of columns covered by the repetitions of the header at the start of a header row, like
+        :meth:`validpanda.helpers.Helper.find_pattern`
+
+        :param header: normalized header row, see :meth:`normalize_header`
+        :return: int
+        """
+        import numpy as np
+        width = len(self.normalized_header)
+        if len(header) < width:
+            raise ValueError("Pattern length is bigger than a header length")
+        repeats = len(header) // width
+        # (repeats * width) -> (repeats, width), one row per repetition
+        matches = (header[:repeats * width].reshape(repeats, width) ==
+                   np.asarray(self.normalized_header, dtype=object)).all(axis=1)
+        return width * (repeats if matches.all() else int(matches.argmin()))
+
+    @classmethod
+    def get(cls, columns_names, header_normalization=("strip",)):
+        """
+        returns the cached compiled block for a definition, compiles it if needed
+
+        :param columns_names: OrderedDict of a Block
+        :param header_normalization: header_normalization of a Block
+        :return: CompiledBlock
+        """
+        try:
+            key = (type(columns_names), tuple(columns_names.items()), tuple(header_normalization))
+            compiled = cls.cache.get(key)
+        except TypeError:
+            # a definition that can not be hashed is not cached
+            return cls(columns_names, header_normalization)
+        if compiled is None:
+            compiled = cls.cache[key] = cls(columns_names, header_normalization)
+        return compiled
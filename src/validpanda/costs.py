@@ -0,0 +1,122 @@
+"""
+Costs
+-----
+
+Defines *CostModel* class of the validpanda package
+"""
+import json
+from .compiled import RegexChecker
+
+
+class CostModel:
+    """
+    Estimates how expensive it is to validate a column, so that cheap columns can be validated first and a file fails
+    as early as possible.
+
+    Without any timings the estimate is a rough static guess in seconds per row: applying a python function is
+    expensive, matching a regular expression is a bit cheaper and converting to a datatype is cheap. Every time a
+    column is validated with this model its timing is recorded, and from then on the learned timing is used instead.
+    :meth:`validpanda.file.File.is_valid` keys the timings by spreadsheet, block and column name, and uses the static
+    estimates in staged mode when no cost model is given.
+
+    >>> cost_model = CostModel()
+    >>> file.is_valid(staged=True, cost_model=cost_model)
+    True
+    >>> cost_model.save("costs.json")
+
+    and in the next run
+
+    >>> cost_model = CostModel.load("costs.json")
+    """
+
+    function_cost = 1e-6
+    """static estimate for applying a python function to a value"""
+    regex_cost = 5e-7
+    """static estimate for matching a regular expression"""
+    dtype_cost = 5e-8
+    """static estimate for converting a value to a datatype"""
+
+    def __init__(self, timings=None, smoothing=0.5, spreadsheet=None):
+        self.timings = dict() if timings is None else timings
+        """learned seconds per row for every "spreadsheet|block|column" key"""
+        self.smoothing = smoothing
+        """weight of the newest timing in the moving average"""
+        self.spreadsheet = spreadsheet
+        """name of the spreadsheet the blocks belong to, block names are only unique inside of a spreadsheet"""
+
+    def for_spreadsheet(self, name):
+        """
+        the cost model of one spreadsheet of a file, it shares the timings with this one
+
+        :param name: name of the spreadsheet
+        :return: CostModel
+        """
+        return CostModel(timings=self.timings, smoothing=self.smoothing, spreadsheet=name)
+
+    def key(self, block, column_name):
+        """
+        key of a column in *self.timings*
+
+        :param block: Block
+        :param column_name: name of the column in the block
+        :return: str
+        """
+        if self.spreadsheet is None:
+            return "{}|{}".format(block.name, column_name)
+        return "{}|{}|{}".format(self.spreadsheet, block.name, column_name)
+
+    def estimate(self, block, column_name):
+        """
+        estimated seconds per row to validate a column
+
+        :param block: Block
+        :param column_name: name of the column in the block
+        :return: float
+        """
+        key = self.key(block, column_name)
+        if key in self.timings:
+            return self.timings[key]
+        function_to_apply, checker = block.compiled.checkers[column_name]
+        cost = self.function_cost if function_to_apply is not None else 0.0
+        if isinstance(checker, RegexChecker):
+            return cost + self.regex_cost
+        return cost + self.dtype_cost
+
+    def record(self, block, column_name, seconds, rows):
+        """
+        records the timing of a column
+
+        :param block: Block
+        :param column_name: name of the column in the block
+        :param seconds: time the validation of the column took
+        :param rows: amount of validated rows
+        :return: None
+        """
+        if rows == 0:
+            return
+        key = self.key(block, column_name)
+        per_row = seconds / rows
+        if key in self.timings:
+            per_row = self.smoothing * per_row + (1 - self.smoothing) * self.timings[key]
+        self.timings[key] = per_row
+
+    def save(self, path):
+        """
+        saves the learned timings as json
+
+        :param path: path to the json file
+        :return: None
+        """
+        with open(path, "w") as f:
+            json.dump(self.timings, f)
+
+    @classmethod
+    def load(cls, path):
+        """
+        loads timings saved with :meth:`save`
+
+        :param path: path to the json file
+        :return: CostModel
+        """
+        with open(path) as f:
+            return cls(timings=json.load(f))
@@ -0,0 +1,63 @@
+"""
+Exceptions
+----------
+
+Defines exceptions raised by the validpanda package
+"""
+
+
+class ValidationError(AssertionError):
+    """
+    raised when a dataframe does not match its Block definition.
+
+    It is a subclass of *AssertionError*, so code that catches the assertions raised by validpanda keeps working.
+    Additionally it remembers where the failure happened:
+
+     * sheet - name of the spreadsheet that failed, set by File
+     * block - name of the block that failed
+     * column - name of the column that failed, None for header failures
+     * column_index - index of the failing column in the dataframe
+     * row - row number inside of the block (the header being row 0) of the first failing value
+    """
+
+    def __init__(self, message, block=None, column=None, column_index=None, row=None, sheet=None):
+        super().__init__(message)
+        self.sheet = sheet
+        """name of the spreadsheet that failed"""
+        self.block = block
+        """name of the block that failed"""
+        self.column = column
+        """name of the column that failed"""
+        self.column_index = column_index
+        """index of the failing column in the dataframe"""
+        self.row = row
+        """first failing row inside of the block"""
+
+    def __reduce__(self):
+        # keep the attributes when the error travels back from a worker process
+        return self.__class__, (str(self), self.block, self.column, self.column_index, self.row, self.sheet)
+
+
+class MemoryBudgetExceeded(MemoryError):
+    """
+    raised when a validation would hold more memory than its :class:`validpanda.memory.MemoryBudget` allows.
+
+     * stage - stage that needed the memory
+     * limit - the budget in bytes
+     * needed - bytes the stage needed
+     * held - bytes that were already held
+    """
+
+    def __init__(self, message, stage=None, limit=None, needed=None, held=None):
+        super().__init__(message)
+        self.stage = stage
+        """stage that needed the memory"""
+        self.limit = limit
+        """the budget in bytes"""
+        self.needed = needed
+        """bytes the stage needed"""
+        self.held = held
+        """bytes that were already held"""
+
+    def __reduce__(self):
+        return self.__class__, (str(self), self.stage, self.limit, self.needed, self.held)
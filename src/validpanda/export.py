@@ -0,0 +1,147 @@
+"""
+Export
+------
+
+Defines *Exporter* class of the validpanda package
+"""
+import os
+import numpy as np
+import pandas as pd
+from .compiled import DtypeChecker
+
+
+class Exporter:
+    """
+    Exports the blocks of a validated File as typed Arrow tables or Parquet files. The layout that the validation
+    resolved is reused, so the block sizes are not searched and the headers are not checked again. A file that was
+    not validated (or whose data changed since) is laid out the same way the validation does it.
+
+    >>> file.is_valid()
+    True
+    >>> Exporter().write_parquet(file, "output")
+    ['output/Sheet1/0_block0.parquet', 'output/Sheet1/1_block1.parquet']
+
+    Every column is converted to its datatype, columns with a regular expression become strings. Blocks with a
+    *header_pattern* are unpivoted into a long format: one row per content row and repetition of the pattern, with
+    the columns of the pattern plus a *row* and a *repeat* column.
+
+    The blocks are exported one by one, so only one typed block is held in memory at a time.
+
+    .. note::
+       requires pyarrow, install it with *pip install validpanda[export]*
+    """
+
+    def __init__(self, long_format=True):
+        self.long_format = long_format
+        """whether blocks with a header_pattern are unpivoted into the long format"""
+
+    def iter_frames(self, file):
+        """
+        iterates over all blocks of all spreadsheets of a file
+
+        :param file: File with data
+        :return: generator of spreadsheet name, block_id, Block, typed pandas dataframe
+        """
+        for indx, dataframe in enumerate(file.data):
+            spreadsheet = file.spreadsheets[indx]["spreadsheet"]
+            layout = spreadsheet.resolved_layout(dataframe)
+            if layout is None:
+                # not validated yet, resolve the layout and check the headers now
+                blocks = ((block_id, block) + block.check_header(block_df)
+                          for block_id, block, block_df in spreadsheet.iter_blocks(spreadsheet.preprocess(dataframe)))
+            else:
+                blocks = spreadsheet.iter_layout(spreadsheet.preprocess(dataframe), layout)
+            for block_id, block, content_df, dataframe_header_dict in blocks:
+                yield file.spreadsheets[indx]["name"], block_id, block, self.block_frame(block, content_df,
+                                                                                         dataframe_header_dict)
+
+    def iter_tables(self, file):
+        """
+        iterates over all blocks of all spreadsheets of a file as Arrow tables
+
+        :param file: File with data
+        :return: generator of spreadsheet name, block_id, Block, pyarrow.Table
+        """
+        pa = import_pyarrow()
+        for name, block_id, block, frame in self.iter_frames(file):
+            yield name, block_id, block, pa.Table.from_pandas(frame, preserve_index=False)
+
+    def write_parquet(self, file, directory):
+        """
+        writes every block to *directory/<spreadsheet name>/<block_id>_<block name>.parquet*
+
+        :param file: File with data
+        :param directory: output directory
+        :return: list of written paths
+        """
+        import_pyarrow()
+        import pyarrow.parquet as pq
+        paths = []
+        for name, block_id, block, table in self.iter_tables(file):
+            os.makedirs(os.path.join(directory, str(name)), exist_ok=True)
+            path = os.path.join(directory, str(name), "{}_{}.parquet".format(block_id, block.name))
+            pq.write_table(table, path)
+            paths.append(path)
+        return paths
+
+    def block_frame(self, block, content_df, dataframe_header_dict):
+        """
+        converts a block to a typed dataframe
+
+        :param block: Block
+        :param content_df: pandas dataframe of the block content, see :meth:`validpanda.block.Block.check_header`
+        :param dataframe_header_dict: dict that maps the dataframe columns to the names of the columns in the block
+        :return: pandas dataframe
+        """
+        if block.header_pattern and self.long_format:
+            pattern = list(block.columns)
+            rows, repeats = content_df.shape[0], content_df.shape[1] // len(pattern)
+            # (rows, repeats * pattern) -> (repeats, rows, pattern) -> (repeats * rows, pattern)
+            values = content_df.to_numpy(dtype=object).reshape(rows, repeats, len(pattern))
+            values = values.transpose(1, 0, 2).reshape(repeats * rows, len(pattern))
+            frame = pd.DataFrame({name: self.typed_column(block, name, values[:, position])
+                                  for position, name in enumerate(pattern)})
+            frame["row"] = np.tile(content_df.index.to_numpy(), repeats)
+            frame["repeat"] = np.repeat(np.arange(repeats), rows)
+            return frame
+        columns = [dataframe_header_dict[column_indx] for column_indx in content_df.columns]
+        if len(set(columns)) != len(columns):
+            # repeated pattern in the wide format, keep the names unique
+            columns = ["{}_{}".format(name, position) for position, name in enumerate(columns)]
+        return pd.DataFrame({name: self.typed_column(block, dataframe_header_dict[column_indx],
+                                                     content_df[column_indx].to_numpy(dtype=object))
+                             for name, column_indx in zip(columns, content_df.columns)})
+
+    @staticmethod
+    def typed_column(block, column_name, values):
+        """
+        converts the values of a column to the datatype of the column
+
+        :param block: Block
+        :param column_name: name of the column in the block
+        :param values: numpy array of objects
+        :return: pandas series
+        """
+        function_to_apply, checker = block.compiled.checkers[column_name]
+        series = pd.Series(values, dtype=object)
+        if function_to_apply is not None:
+            series = series.apply(function_to_apply)
+        if isinstance(checker, DtypeChecker):
+            series = series.astype(checker.dtype)
+        if pd.api.types.is_object_dtype(series.dtype):
+            # arrow needs one type per column
+            series = series.where(series.isna(), series.astype(str))
+        return series
+
+
+def import_pyarrow():
+    """
+    imports pyarrow, which is an optional dependency
+
+    :return: pyarrow module
+    """
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError("exporting requires pyarrow, install it with 'pip install validpanda[export]'")
+    return pyarrow
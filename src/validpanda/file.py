@@ -4,7 +4,13 @@ File
 
 Defines *File* class of the validpanda package
 """
-import pandas as pd
+import contextlib
+import copy
+import time
+from .backends import get_backend, PANDAS
+from .costs import CostModel
+from .exceptions import ValidationError
+from .spreadsheet import Spreadsheet
 
 
 class File:
@@ -83,26 +89,233 @@ class File:
         self.data = tuple()
         """a list or tuple with dataframes to be validated"""
 
-    def is_valid(self):
+    def is_valid(self, sampling=None, staged=False, cost_model=None, memory_budget=None):
         """
         core method to validate whether a given file matches this class definition.
 
+        :param sampling: optional :class:`validpanda.sampling.Sampling` for a quick triage. Layout and headers are
+                         checked exactly, values only on a sample of rows. Call again without it to escalate.
+        :param staged: if True, the layout and the headers of all blocks in all spreadsheets are checked first, and
+                       only then the values of the columns. Structural errors are found without the expensive work.
+        :param cost_model: optional :class:`validpanda.costs.CostModel`, validates the cheapest columns first. In
+                           staged mode the static estimates of a new CostModel are used if None.
+        :param memory_budget: optional :class:`validpanda.memory.MemoryBudget`. Raises
+                              :class:`validpanda.exceptions.MemoryBudgetExceeded` before the validation holds more
+                              memory than allowed, *memory_budget.peak* reports the peak usage afterwards.
+        :return: Boolean
+        """
+        self.check_data()
+        if staged and cost_model is None:
+            cost_model = CostModel()
+        raw_bytes = 0
+        if memory_budget is not None:
+            # the sizes are measured with pandas
+            if any(get_backend(dataframe) is not PANDAS for dataframe in self.data):
+                raise NotImplementedError("sampling and memory budgets are only supported by the pandas backend")
+            raw_bytes = memory_budget.charge("raw", sum(memory_budget.size(dataframe) for dataframe in self.data))
+        try:
+            if staged:
+                structures = []
+                try:
+                    for indx, dataframe in enumerate(self.data):
+                        with spreadsheet_errors(self.spreadsheets[indx]["name"]):
+                            structures.append(self.spreadsheets[indx]["spreadsheet"].check_structure(
+                                dataframe, memory_budget=memory_budget))
+                    for indx, structure in enumerate(structures):
+                        with spreadsheet_errors(self.spreadsheets[indx]["name"]):
+                            if not self.spreadsheets[indx]["spreadsheet"].is_valid_structure(
+                                    structure,
+                                    sampling=sampling,
+                                    cost_model=self.spreadsheet_costs(cost_model, indx),
+                                    memory_budget=memory_budget):
+                                return False
+                finally:
+                    for structure in structures:
+                        Spreadsheet.release(memory_budget, "block", sum(entry[3] for entry in structure))
+                return True
+            for indx, dataframe in enumerate(self.data):
+                with spreadsheet_errors(self.spreadsheets[indx]["name"]):
+                    if not self.spreadsheets[indx]["spreadsheet"].is_valid(dataframe,
+                                                                           sampling=sampling,
+                                                                           cost_model=self.spreadsheet_costs(
+                                                                               cost_model, indx),
+                                                                           memory_budget=memory_budget):
+                        return False
+            return True
+        finally:
+            if memory_budget is not None:
+                memory_budget.release("raw", raw_bytes)
+
+    def spreadsheet_costs(self, cost_model, indx):
+        """
+        :param cost_model: CostModel or None
+        :param indx: id of the spreadsheet
+        :return: the cost model of the spreadsheet, None if *cost_model* is None
+        """
+        if cost_model is None:
+            return None
+        return cost_model.for_spreadsheet(self.spreadsheets[indx]["name"])
 
+    def is_valid_stream(self, data):
+        """
+        validates a file whose spreadsheets come in row chunks, see
+        :meth:`validpanda.spreadsheet.Spreadsheet.is_valid_stream`. Only one chunk is kept in memory at a time.
+
+        :param data: tuple with one iterable of dataframes per spreadsheet
         :return: Boolean
         """
+        assert(isinstance(data, tuple)), \
+            "File class only accepts tuples of chunk iterables, not {}".format(type(data))
+        for indx, chunks in enumerate(data):
+            with spreadsheet_errors(self.spreadsheets[indx]["name"]):
+                if not self.spreadsheets[indx]["spreadsheet"].is_valid_stream(self.check_chunks(indx, chunks)):
+                    return False
+        return True
+
+    @staticmethod
+    def check_chunks(indx, chunks):
+        """
+        checks every chunk of a spreadsheet the same way :meth:`check_data` checks whole dataframes
+
+        :param indx: id of the spreadsheet
+        :param chunks: iterable of dataframes
+        :return: generator of dataframes
+        """
+        for chunk in chunks:
+            PANDAS.check_types(chunk, indx)
+            yield chunk
+
+    def check_data(self):
+        """
+        checks that *self.data* is a tuple of pandas dataframes with 'object' datatype only, or of polars dataframes
+        with string datatype only
+
+        :return: None
+        """
         assert(isinstance(self.data, tuple)), \
             "File class only accepts tuples of dataframes, not {}".format(type(self.data))
         for indx, dataframe in enumerate(self.data):
-            assert(isinstance(dataframe, pd.DataFrame)), \
-                "{} entry in data tuple is not a dataframe, but {}".format(indx, type(dataframe))
-
-            for col_indx, col_dtype in enumerate(dataframe.dtypes):
-                assert(pd.api.types.is_object_dtype(col_dtype)), \
-                    "validpanda only accepts 'object' datatypes on columns, not {} in col number {}".format(col_dtype,
-                                                                                                            col_indx)
-            if not self.spreadsheets[indx]["spreadsheet"].is_valid(dataframe):
-                return False
-        return True
+            get_backend(dataframe).check_types(dataframe, indx)
+
+    async def ais_valid(self, executor=None, timeout=None, sampling=None):
+        """
+        asynchronous version of :meth:`is_valid`. The spreadsheets are validated concurrently in the executor.
+
+        :param executor: concurrent.futures executor, the default executor of the loop if None
+        :param timeout: seconds after which the validation is cancelled and asyncio.TimeoutError is raised
+        :param sampling: optional :class:`validpanda.sampling.Sampling`
+        :return: Boolean
+        """
+        import asyncio
+
+        async def validate():
+            events = self.aiter_valid(executor=executor, sampling=sampling)
+            try:
+                async for event in events:
+                    if not event["valid"]:
+                        return False
+            finally:
+                await events.aclose()
+            return True
+
+        return await asyncio.wait_for(validate(), timeout)
+
+    async def aiter_valid(self, executor=None, sampling=None):
+        """
+        asynchronous generator that validates all spreadsheets concurrently in the executor and yields one progress
+        event per spreadsheet in the order of the spreadsheets:
+
+        >>> {"stage": "spreadsheet", "id": 0, "name": "Sheet1", "valid": True, "seconds": 0.2}
+
+        The first failing spreadsheet raises its exception, like :meth:`is_valid` does. If the generator is closed,
+        cancelled or fails, the validations that did not start yet are cancelled.
+
+        .. note::
+           every spreadsheet is validated on its own copy of the Spreadsheet definition, because validation stores
+           the calculated layout on the Block objects. With a ProcessPoolExecutor all definitions must be picklable
+           and the dataframes are handed to the workers as :class:`validpanda.shared.SharedFrame`, or through the
+           pipe of the executor if there is no space left for them (see :func:`validpanda.shared.share`). The report
+           of *sampling* is filled in the order of the spreadsheets when their events are yielded.
+
+        :param executor: concurrent.futures executor, the default executor of the loop if None
+        :param sampling: optional :class:`validpanda.sampling.Sampling`
+        :return: async generator of dicts
+        """
+        import asyncio
+        import concurrent.futures
+        from .shared import SharedFrame, share
+
+        self.check_data()
+        loop = asyncio.get_running_loop()
+        shared = contextlib.ExitStack()
+        futures = []
+        try:
+            data = self.data
+            if isinstance(executor, concurrent.futures.ProcessPoolExecutor):
+                # writing the files takes a while, it must not block the event loop
+                data = await asyncio.gather(*[loop.run_in_executor(None, share, dataframe) for dataframe in data],
+                                            return_exceptions=True)
+                for dataframe in data:
+                    if isinstance(dataframe, SharedFrame):
+                        shared.enter_context(dataframe)
+                for dataframe in data:
+                    if isinstance(dataframe, BaseException):
+                        raise dataframe
+            futures = [loop.run_in_executor(executor,
+                                            timed_is_valid,
+                                            copy.deepcopy(self.spreadsheets[indx]["spreadsheet"]),
+                                            dataframe,
+                                            sampling)
+                       for indx, dataframe in enumerate(data)]
+            for indx, future in enumerate(futures):
+                with spreadsheet_errors(self.spreadsheets[indx]["name"]):
+                    valid, seconds, report = await future
+                if sampling is not None:
+                    sampling.report.extend(report)
+                yield {"stage": "spreadsheet",
+                       "id": indx,
+                       "name": self.spreadsheets[indx]["name"],
+                       "valid": valid,
+                       "seconds": seconds}
+        finally:
+            for future in futures:
+                future.cancel()
+            shared.close()
+
+
+@contextlib.contextmanager
+def spreadsheet_errors(name):
+    """
+    sets the name of the spreadsheet on ValidationErrors raised inside of the context
+
+    :param name: name of the spreadsheet
+    """
+    try:
+        yield
+    except ValidationError as e:
+        if e.sheet is None:
+            e.sheet = name
+        raise
+
+
+def timed_is_valid(spreadsheet, dataframe, sampling=None):
+    """
+    validates a dataframe against a spreadsheet and measures the time
+
+    :param spreadsheet: Spreadsheet
+    :param dataframe: pandas dataframe or :class:`validpanda.shared.SharedFrame`
+    :param sampling: optional :class:`validpanda.sampling.Sampling`, it is not changed
+    :return: Boolean, seconds, the report entries of the sampling
+    """
+    from .shared import attach
+    if sampling is not None:
+        # a worker process only has a copy of the sampling, the caller merges the entries into its own report
+        sampling = copy.copy(sampling)
+        sampling.report = []
+    dataframe = attach(dataframe)
+    start = time.perf_counter()
+    valid = spreadsheet.is_valid(dataframe, sampling=sampling)
+    return valid, time.perf_counter() - start, [] if sampling is None else sampling.report
 
 
 if __name__ == "__main__":
@@ -11,6 +11,27 @@ class Helper:
         for i in range(0, len(l), n):
             yield l[i:i + n]
 
+    @staticmethod
+    def partitions(length, n):
+        """
+        Split range(length) into n contiguous partitions of almost equal size. For example:
+
+        length = 10, n = 3
+
+        yield (0, 4), (4, 7), (7, 10)
+
+        :param length: amount of rows to split
+        :param n: amount of partitions
+        :return: generator of (start, stop) tuples
+        """
+        size, remainder = divmod(length, n)
+        start = 0
+        for i in range(n):
+            stop = start + size + (1 if i < remainder else 0)
+            if stop > start:
+                yield start, stop
+            start = stop
+
     @staticmethod
     def find_pattern(header, pattern):
         """
@@ -0,0 +1,174 @@
+"""
+Memory
+------
+
+Defines *MemoryBudget* class of the validpanda package
+"""
+import sys
+from .exceptions import MemoryBudgetExceeded
+
+
+class MemoryBudget:
+    """
+    Keeps track of the approximate amount of memory held by the dataframes of a validation and stops it before it
+    goes over a limit.
+
+    >>> memory_budget = MemoryBudget(limit=2 * 1024 ** 3)
+    >>> file.is_valid(memory_budget=memory_budget)
+    True
+    >>> memory_budget.peak
+    734003200
+
+    The bytes are counted per stage:
+
+     * raw - the dataframes of the File
+     * preprocessed - the columns of the dataframe returned by *preprocess_func* that it really copied
+     * block - the columns of the block being validated that are not views of the preprocessed dataframe
+     * column - the converted column being validated
+
+    Every stage is released as soon as it is done. If converting the columns of a block would go over the limit,
+    the block is validated in row chunks that fit into the rest of the budget (unless *chunked_fallback* is False).
+    If even that is not possible, :class:`validpanda.exceptions.MemoryBudgetExceeded` is raised.
+
+    .. note::
+       the sizes are estimates. Object columns are measured on a sample of their values. Slices and copy-on-write
+       copies share the memory of their dataframe, so they cost nothing until they are written to.
+    """
+
+    def __init__(self, limit, chunked_fallback=True):
+        self.limit = limit
+        """maximum amount of bytes"""
+        self.chunked_fallback = chunked_fallback
+        """whether blocks that do not fit are validated in row chunks instead of failing"""
+        self.held = dict()
+        """bytes held per stage right now"""
+        self.peak = 0
+        """maximum of the bytes held at the same time"""
+        self.peaks = dict()
+        """maximum of the bytes held per stage"""
+
+    @property
+    def used(self):
+        """
+        :return: bytes held right now
+        """
+        return sum(self.held.values())
+
+    def report(self):
+        """
+        :return: dict with limit, peak and the peak of every stage
+        """
+        return {"limit": self.limit, "peak": self.peak, "stages": dict(self.peaks)}
+
+    def charge(self, stage, nbytes):
+        """
+        adds bytes to a stage. Raises MemoryBudgetExceeded if that goes over the limit.
+
+        :param stage: name of the stage
+        :param nbytes: amount of bytes
+        :return: nbytes
+        """
+        if self.used + nbytes > self.limit:
+            raise MemoryBudgetExceeded("Memory budget of {} bytes exceeded in stage {}: {} bytes needed, {} bytes "
+                                       "already held ({})".format(self.limit, stage, nbytes, self.used, self.held),
+                                       stage=stage,
+                                       limit=self.limit,
+                                       needed=nbytes,
+                                       held=self.used)
+        self.held[stage] = self.held.get(stage, 0) + nbytes
+        self.peak = max(self.peak, self.used)
+        self.peaks[stage] = max(self.peaks.get(stage, 0), self.held[stage])
+        return nbytes
+
+    def release(self, stage, nbytes):
+        """
+        removes bytes from a stage
+
+        :param stage: name of the stage
+        :param nbytes: amount of bytes
+        :return: None
+        """
+        self.held[stage] = max(0, self.held.get(stage, 0) - nbytes)
+
+    def chunk_rows(self, dataframe, functions=True):
+        """
+        amount of rows of a block content that can be validated at once within the rest of the budget.
+
+        :param dataframe: pandas dataframe without the header
+        :param functions: see :meth:`column_size`
+        :return: amount of rows, None if all rows fit
+        """
+        rows = dataframe.shape[0]
+        column_bytes = self.column_size(dataframe, functions=functions)
+        available = self.limit - self.used
+        if column_bytes <= available or rows == 0:
+            return None
+        # leave a fifth of the room for the error of the estimate
+        chunk = int(0.8 * rows * available / column_bytes)
+        if not self.chunked_fallback or chunk < 1:
+            # charging raises the error with the details
+            self.charge("column", column_bytes)
+        return chunk
+
+    @classmethod
+    def column_size(cls, dataframe, functions=True):
+        """
+        estimated bytes needed to validate the biggest column: the column after applying its function plus its
+        converted copy. Without functions no python objects are created, the converted copy and the mask of the
+        failing rows are arrays of the length of the column.
+
+        :param dataframe: pandas dataframe without the header
+        :param functions: whether functions are applied to the columns
+        :return: bytes
+        """
+        if dataframe.shape[1] == 0:
+            return 0
+        if not functions:
+            return 2 * int(dataframe.memory_usage(index=False, deep=False).max())
+        return 2 * max(cls.size(dataframe[[column_indx]]) for column_indx in dataframe.columns)
+
+    @classmethod
+    def size(cls, dataframe, sample=1000, held=None):
+        """
+        estimated size of a dataframe in bytes. The python objects of object columns are measured on a sample of at
+        most *sample* evenly spaced values.
+
+        :param dataframe: pandas dataframe
+        :param sample: amount of values measured per object column
+        :param held: optional pandas dataframe that is charged already. Columns that point into its memory, like the
+                     columns of a slice or of a copy-on-write copy of it, are not counted, only the new index.
+        :return: bytes
+        """
+        nbytes = int(dataframe.index.memory_usage())
+        shared = set() if held is None else {id(owner) for owner in cls.owners(held) if owner is not None}
+        rows = dataframe.shape[0]
+        step = max(1, rows // sample)
+        for position, (dtype, column_bytes, owner) in enumerate(zip(dataframe.dtypes,
+                                                                    dataframe.memory_usage(index=False, deep=False),
+                                                                    cls.owners(dataframe))):
+            if owner is not None and id(owner) in shared:
+                continue
+            nbytes += int(column_bytes)
+            if dtype == object and rows:
+                values = dataframe.iloc[::step, position]
+                nbytes += int(sum(sys.getsizeof(value) for value in values) / len(values) * rows)
+        return nbytes
+
+    @staticmethod
+    def owners(dataframe):
+        """
+        :param dataframe: pandas dataframe
+        :return: list with the numpy array that owns the memory of every column, None for extension arrays
+        """
+        import numpy as np
+
+        owners = []
+        for position in range(dataframe.shape[1]):
+            owner = dataframe.iloc[:, position].values
+            if not isinstance(owner, np.ndarray):
+                owner = None
+            else:
+                while isinstance(owner.base, np.ndarray):
+                    owner = owner.base
+            owners.append(owner)
+        return owners
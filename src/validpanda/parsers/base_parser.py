@@ -46,6 +46,9 @@ class BaseParser:
     ...                          "header": True,
     ...                          "content_length": None,
     ...                          "header_pattern": True,
+    ...                          "header_normalization": ("strip", "casefold", "collapse_whitespace"),
+    ...                          "partitions": 4,
+    ...                          "partition_executor": "thread",
     ...                          },
     ...
     ...               }
@@ -58,14 +61,26 @@ class BaseParser:
     ...                                      "preprocess_func": lambda x: x.reset_index(drop=True)
     ...                                      },
     ...                     }
-    >>>     file = {"spreadsheets": {0: {"name": "Sheet1", "spreadsheet": "spreadsheet0"},
-    ...                              }
+    >>>     file = {"spreadsheet_allocation": {0: {"name": "Sheet1", "spreadsheet": "spreadsheet0"},
+    ...                                        },
+    ...             "extension": "xlsx"
     ...             }
     >>>     def __init__(self, **kwargs):
     ...         super().__init__(**kwargs)
     ...         self.initialise(ExampleParser.blocks,
     ...                         ExampleParser.spreadsheets,
     ...                         ExampleParser.file)
+
+    A file is then read and validated with
+
+    >>> parser = ExampleParser(file_path="example.xlsx")
+    >>> parser.validate()
+    True
+
+    or, inside of a coroutine, without blocking the event loop
+
+    >>> await parser.avalidate(executor=executor, timeout=60)
+    True
     """
 
     def __init__(self, file_path=None, file_name=None):
@@ -84,11 +99,11 @@ class BaseParser:
 
         :return: None
         """
-        spreadsheet_allocation = file["spreadsheet_allocation"]
+        spreadsheet_allocation = {}
 
         for spreadsheet, svalue in file["spreadsheet_allocation"].items():
 
-            blocks_allocation = spreadsheets[svalue["spreadsheet"]]["blocks_allocation"]
+            blocks_allocation = {}
 
             for block, bvalue in spreadsheets[svalue["spreadsheet"]]["blocks_allocation"].items():
                 block_ = Block()
@@ -97,14 +112,121 @@ class BaseParser:
                 block_.header = blocks[bvalue["block"]]["header"]
                 block_.content_length = blocks[bvalue["block"]]["content_length"]
                 block_.header_pattern = blocks[bvalue["block"]]["header_pattern"]
+                block_.partitions = blocks[bvalue["block"]].get("partitions", 1)
+                block_.partition_executor = blocks[bvalue["block"]].get("partition_executor", "process")
+                block_.header_normalization = blocks[bvalue["block"]].get("header_normalization", ("strip",))
 
-                blocks_allocation[block]["block"] = block_
+                blocks_allocation[block] = {"coordinates": bvalue["coordinates"], "block": block_}
 
             spreadsheet_ = Spreadsheet()
             spreadsheet_.blocks_allocation = blocks_allocation
             spreadsheet_.preprocess_func = spreadsheets[svalue["spreadsheet"]]["preprocess_func"]
 
-            spreadsheet_allocation[spreadsheet]["spreadsheet"] = spreadsheet_
+            spreadsheet_allocation[spreadsheet] = dict(svalue, spreadsheet=spreadsheet_)
 
         self.file.spreadsheets = spreadsheet_allocation
         self.file.extension = file["extension"]
+
+    @staticmethod
+    def load_data(file_path, extension, sheet_names):
+        """
+        reads all spreadsheets of a file into dataframes with 'object' datatype and without a header,
+        as expected by :meth:`validpanda.file.File.is_valid`.
+
+        :param file_path: path to the file
+        :param extension: one of "xlsx", "xls" or "csv". A csv file is a single spreadsheet.
+        :param sheet_names: names of the spreadsheets in the order of the File definition
+        :return: tuple of dataframes
+        """
+        import pandas as pd
+        if extension in ("xlsx", "xls"):
+            sheets = pd.read_excel(file_path, sheet_name=list(sheet_names), header=None, dtype=object)
+            return tuple(sheets[name] for name in sheet_names)
+        elif extension == "csv":
+            return (pd.read_csv(file_path, header=None, dtype=object),)
+        raise ValueError("extension {} is not supported".format(extension))
+
+    def read(self, file_path=None):
+        """
+        reads the file into *self.file.data*
+
+        :param file_path: path to the file, *self.file_path* by default
+        :return: None
+        """
+        self.file.data = self.load_data(file_path or self.file_path, self.file.extension, self.sheet_names)
+
+    def validate(self, file_path=None, sampling=None, chunksize=None):
+        """
+        reads and validates the file
+
+        :param file_path: path to the file, *self.file_path* by default
+        :param sampling: optional :class:`validpanda.sampling.Sampling`
+        :param chunksize: only for csv files. If given, the file is streamed in chunks of that many rows, see
+                          :meth:`validpanda.file.File.is_valid_stream`
+        :return: Boolean
+        """
+        if chunksize is not None:
+            if self.file.extension != "csv":
+                raise ValueError("only csv files can be validated in chunks, not {}".format(self.file.extension))
+            import pandas as pd
+            with pd.read_csv(file_path or self.file_path, header=None, dtype=object, chunksize=chunksize) as reader:
+                return self.file.is_valid_stream((reader,))
+        self.read(file_path)
+        return self.file.is_valid(sampling=sampling)
+
+    @property
+    def sheet_names(self):
+        """
+        names of the spreadsheets in the order of their ids
+
+        :return: list
+        """
+        return [self.file.spreadsheets[indx]["name"] for indx in sorted(self.file.spreadsheets)]
+
+    async def avalidate(self, file_path=None, executor=None, timeout=None, sampling=None):
+        """
+        asynchronous version of :meth:`validate`. Reading and the validation of every spreadsheet run in the executor,
+        so the event loop stays free. The spreadsheets are validated concurrently.
+
+        :param file_path: path to the file, *self.file_path* by default
+        :param executor: concurrent.futures executor, the default executor of the loop if None
+        :param timeout: seconds after which the validation is cancelled and asyncio.TimeoutError is raised
+        :param sampling: optional :class:`validpanda.sampling.Sampling`
+        :return: Boolean
+        """
+        import asyncio
+
+        async def validate():
+            events = self.aiter_validate(file_path, executor=executor, sampling=sampling)
+            try:
+                async for event in events:
+                    if not event["valid"]:
+                        return False
+            finally:
+                await events.aclose()
+            return True
+
+        return await asyncio.wait_for(validate(), timeout)
+
+    async def aiter_validate(self, file_path=None, executor=None, sampling=None):
+        """
+        asynchronous generator that reads and validates the file and yields progress events, first
+        *{"stage": "read", "valid": True}* and then one event per spreadsheet,
+        see :meth:`validpanda.file.File.aiter_valid`.
+
+        :param file_path: path to the file, *self.file_path* by default
+        :param executor: concurrent.futures executor, the default executor of the loop if None
+        :param sampling: optional :class:`validpanda.sampling.Sampling`
+        :return: async generator of dicts
+        """
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        self.file.data = await loop.run_in_executor(executor,
+                                                    self.load_data,
+                                                    file_path or self.file_path,
+                                                    self.file.extension,
+                                                    self.sheet_names)
+        yield {"stage": "read", "valid": True}
+        async for event in self.file.aiter_valid(executor=executor, sampling=sampling):
+            yield event
@@ -0,0 +1,88 @@
+"""
+Sampling
+--------
+
+Defines *Sampling* class of the validpanda package
+"""
+import zlib
+import numpy as np
+
+
+class Sampling:
+    """
+    Sampling mode for a quick triage of big files. Layout and headers are checked exactly as usual, but the values of
+    the columns are validated only on a sample of the content rows of every block.
+
+    >>> sampling = Sampling(size=500, seed=42)
+    >>> file.is_valid(sampling=sampling)
+    True
+    >>> sampling.invalid_fraction_bound
+    0.006
+
+    A *True* answer means that the file is almost certainly valid, *False* or an exception means that the file is
+    definitely invalid. To escalate to the full validation simply call *is_valid* again without sampling.
+
+    Rows are taken either randomly (default) or stratified, which means that the content is cut into *size* equally
+    long strata with one random row per stratum, so that every part of a long block is covered. The same seed always
+    gives the same sample for the same file.
+    """
+
+    def __init__(self, size=1000, seed=None, stratified=False):
+        self.size = size
+        """maximum amount of content rows validated per block"""
+        self.seed = seed
+        """seed of the random generator, makes the sample reproducible"""
+        self.stratified = stratified
+        """whether to take one row per stratum instead of a plain random sample"""
+        self.report = []
+        """one dict per validated block with keys block, zero, rows, sampled and invalid_fraction_bound"""
+
+    @property
+    def invalid_fraction_bound(self):
+        """
+        the confidence hint over all blocks validated so far: the biggest fraction of invalid rows that a block could
+        still contain with 95% confidence, given that all sampled rows were valid. 0 means every row was validated.
+
+        :return: float
+        """
+        return max((entry["invalid_fraction_bound"] for entry in self.report), default=0.0)
+
+    def take(self, dataframe, block):
+        """
+        takes the sample of the content rows of a block. The row order and the index are kept.
+
+        :param dataframe: pandas dataframe without the header
+        :param block: Block the content belongs to
+        :return: sampled dataframe
+        """
+        rows = dataframe.shape[0]
+        if rows <= self.size:
+            sample = dataframe
+        else:
+            rng = np.random.default_rng(self.block_seed(block))
+            if self.stratified:
+                bounds = np.linspace(0, rows, self.size + 1).astype(np.int64)
+                positions = rng.integers(bounds[:-1], bounds[1:])
+            else:
+                positions = np.sort(rng.choice(rows, size=self.size, replace=False))
+            sample = dataframe.iloc[positions].copy()
+        self.report.append({"block": block.name,
+                            "zero": block.zero,
+                            "rows": rows,
+                            "sampled": sample.shape[0],
+                            # rule of three: 0 failures in n draws bounds the failure rate by 3/n at 95% confidence
+                            "invalid_fraction_bound": 0.0 if sample.shape[0] == rows else 3 / sample.shape[0],
+                            })
+        return sample
+
+    def block_seed(self, block):
+        """
+        seed for a particular block, so that the sample of a block does not depend on the blocks validated before.
+
+        :param block: Block
+        :return: list of ints or None without a seed
+        """
+        if self.seed is None:
+            return None
+        zero_row, zero_col = block.zero if block.zero is not None else (0, 0)
+        return [self.seed, zlib.crc32(str(block.name).encode()), zero_row, zero_col]
@@ -0,0 +1,503 @@
+"""
+Service
+-------
+
+Defines *ValidationService* class, a long-lived validator behind the *validpanda-service* console command.
+Importing pandas and initialising the parsers is paid once per worker process when the service starts, afterwards
+jobs only pay for reading and validating their file.
+
+>>> validpanda-service run spool/ --parser mypackage.parsers:ExampleParser --workers 4
+
+Jobs are submitted through the spool directory, from the command line or with :func:`submit`
+
+>>> validpanda-service submit spool/ mypackage.parsers:ExampleParser data/a.xlsx --wait
+{"path": "/home/user/data/a.xlsx", "status": "valid", ..., "id": "...", "latency_seconds": 0.4}
+
+The spool directory contains
+
+ * incoming - one json file per waiting job
+ * processing - jobs that are being validated, named after the job and the process id of their service. When a
+   service starts, the jobs of services that are not running anymore are moved back to incoming
+ * done - one json file per result, the json line of the *validpanda* command plus *id*, *parser* and
+   *latency_seconds* (from submission to result)
+ * stats.json - queue depth, latency percentiles and the throughput of every parser, see
+   :meth:`ValidationService.stats`
+
+Jobs are claimed by renaming them, so several services on the same machine can share one spool directory.
+"""
+import argparse
+import collections
+import concurrent.futures
+import concurrent.futures.process
+import functools
+import json
+import math
+import os
+import signal
+import sys
+import threading
+import time
+import uuid
+from .cli import load_parser_class, new_result, validate_file
+
+worker_parsers = dict()
+"""warm parser instances of a worker process per parser path"""
+worker_memory_limit = None
+"""memory budget in bytes of a worker process for one file"""
+
+
+class ValidationService:
+    """
+    Validates the jobs of a spool directory in a pool of worker processes with warm parsers
+
+    >>> service = ValidationService("spool", parsers=["mypackage.parsers:ExampleParser"], workers=4)
+    >>> threading.Thread(target=service.serve_forever).start()
+    >>> job_id = submit("spool", "mypackage.parsers:ExampleParser", "data/a.xlsx")
+    >>> result("spool", job_id, timeout=60)["status"]
+    'valid'
+    >>> service.stop()
+
+    Every worker process creates an instance of every parser given to the constructor when it starts (see
+    :func:`init_worker`), parsers that are not given are created by the first job that needs them in a worker. The
+    statistics are kept by the service process. If a worker dies, the pool is started again and the jobs that were
+    in flight are validated again one at a time, so only the job that kills its worker fails with an error.
+    """
+
+    def __init__(self, spool, parsers=(), workers=4, memory_limit=None, poll_interval=0.2):
+        self.spool = spool
+        """path to the spool directory"""
+        self.workers = workers
+        """amount of jobs validated at the same time"""
+        self.memory_limit = memory_limit
+        """memory budget in bytes per file, see :class:`validpanda.memory.MemoryBudget`"""
+        self.poll_interval = poll_interval
+        """seconds to wait for new jobs when the spool directory is empty"""
+        self.parsers = list(parsers)
+        """parser paths every worker process creates when it starts"""
+        self.in_flight = set()
+        """ids of the jobs that are being validated"""
+        self.suspects = set()
+        """ids of the jobs that were in flight when a worker died, they are validated again one at a time"""
+        self.completed = 0
+        """amount of finished jobs"""
+        self.latencies = collections.deque(maxlen=10000)
+        """seconds from submission to result of the last jobs"""
+        self.throughput = dict()
+        """amount of files and seconds spent per parser path"""
+        self.started = time.time()
+        """start time of the service"""
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.broken = threading.Event()
+        for directory in ("incoming", "processing", "done"):
+            os.makedirs(os.path.join(spool, directory), exist_ok=True)
+        for parser_path in self.parsers:
+            # wrong parser paths fail here and not in every worker
+            load_parser_class(parser_path)
+
+    def executor(self):
+        """
+        :return: ProcessPoolExecutor whose workers create the warm parsers
+        """
+        self.broken.clear()
+        return concurrent.futures.ProcessPoolExecutor(max_workers=self.workers,
+                                                      initializer=init_worker,
+                                                      initargs=(self.parsers, self.memory_limit))
+
+    def serve_forever(self):
+        """
+        validates jobs until :meth:`stop` is called. The jobs that are being validated are finished before it returns.
+
+        :return: None
+        """
+        self.recover()
+        executor = self.executor()
+        try:
+            while not self.stopped.is_set():
+                if self.broken.is_set():
+                    executor.shutdown()
+                    executor = self.executor()
+                if self.suspects:
+                    jobs = self.claim(0 if self.in_flight else 1, only=self.suspects)
+                    if not jobs and not self.in_flight:
+                        # suspects that are not waiting anymore, e.g. taken by another service
+                        with self.lock:
+                            self.suspects.intersection_update(self.incoming())
+                else:
+                    jobs = self.claim(self.workers - len(self.in_flight))
+                for job in jobs:
+                    self.process(executor, job)
+                self.write_stats()
+                if not jobs:
+                    self.stopped.wait(self.poll_interval)
+        finally:
+            executor.shutdown()
+        self.write_stats()
+
+    def stop(self):
+        """
+        stops :meth:`serve_forever`
+
+        :return: None
+        """
+        self.stopped.set()
+
+    def recover(self):
+        """
+        moves the jobs that were being validated when a service stopped back to incoming. Jobs of services that are
+        still running are left alone.
+
+        :return: None
+        """
+        for name in os.listdir(os.path.join(self.spool, "processing")):
+            job_id, _, owner = name[:-len(".json")].partition("@")
+            # a service that was restarted may have the process id of its previous run, e.g. 1 in a container
+            if owner.isdigit() and int(owner) != os.getpid() and alive(int(owner)):
+                continue
+            os.replace(os.path.join(self.spool, "processing", name),
+                       os.path.join(self.spool, "incoming", job_id + ".json"))
+
+    def processing(self, job_id):
+        """
+        :param job_id: id of a job claimed by this service
+        :return: path of the job in processing
+        """
+        return os.path.join(self.spool, "processing", "{}@{}.json".format(job_id, os.getpid()))
+
+    def incoming(self):
+        """
+        :return: ids of the waiting jobs, the oldest first
+        """
+        return [name[:-len(".json")] for name in sorted(os.listdir(os.path.join(self.spool, "incoming")))
+                if name.endswith(".json")]
+
+    def claim(self, limit, only=None):
+        """
+        moves up to *limit* jobs from incoming to processing, the oldest first
+
+        :param limit: maximum amount of jobs
+        :param only: optional set of job ids, other jobs are not claimed
+        :return: list of jobs
+        """
+        jobs = []
+        for job_id in self.incoming():
+            if len(jobs) >= limit:
+                break
+            if only is not None and job_id not in only:
+                continue
+            processing = self.processing(job_id)
+            try:
+                os.rename(os.path.join(self.spool, "incoming", job_id + ".json"), processing)
+            except FileNotFoundError:
+                # claimed by another service
+                continue
+            try:
+                with open(processing) as f:
+                    job = json.load(f)
+            except ValueError as e:
+                job = {"id": job_id, "parser": None, "path": None, "submitted": None, "error": str(e)}
+            with self.lock:
+                self.in_flight.add(job["id"])
+            jobs.append(job)
+        return jobs
+
+    def process(self, executor, job):
+        """
+        submits the file of a job to a worker process, the result is written by :meth:`finish`
+
+        :param executor: ProcessPoolExecutor returned by :meth:`executor`
+        :param job: dict with id, parser, path and submitted
+        :return: None
+        """
+        start = time.perf_counter()
+        if "error" in job:
+            self.complete(job, new_result(job["path"], "error", "ValueError: job can not be read: {}".format(
+                job["error"])), 0.0)
+            return
+        try:
+            future = executor.submit(validate_job, job["parser"], job["path"])
+        except concurrent.futures.process.BrokenProcessPool:
+            # a worker died since the last check, the job waits for the new pool
+            self.broken.set()
+            self.requeue(job)
+            return
+        future.add_done_callback(functools.partial(self.finish, job, start))
+
+    def finish(self, job, start, future):
+        """
+        writes the result of a job when its worker is done
+
+        :param job: dict with id, parser, path and submitted
+        :param start: time.perf_counter() when the job was submitted to the pool
+        :param future: future of :func:`validate_job`
+        :return: None
+        """
+        try:
+            result, seconds = future.result()
+        except Exception as e:
+            if isinstance(e, concurrent.futures.process.BrokenProcessPool):
+                self.broken.set()
+                if job["id"] not in self.suspects:
+                    # every job in flight fails, any of them may have killed its worker. A suspect runs alone, so
+                    # it is only an error if it breaks the pool again
+                    with self.lock:
+                        self.suspects.add(job["id"])
+                    self.requeue(job)
+                    return
+            result = new_result(job["path"], "error", "{}: {}".format(type(e).__name__, e))
+            seconds = time.perf_counter() - start
+        self.complete(job, result, seconds)
+
+    def requeue(self, job):
+        """
+        moves a claimed job back to incoming
+
+        :param job: dict with id, parser, path and submitted
+        :return: None
+        """
+        try:
+            os.replace(self.processing(job["id"]), os.path.join(self.spool, "incoming", job["id"] + ".json"))
+        finally:
+            with self.lock:
+                self.in_flight.discard(job["id"])
+
+    def complete(self, job, result, seconds):
+        """
+        writes the result of a job and updates the statistics
+
+        :param job: dict with id, parser, path and submitted
+        :param result: dict, the json line of the file
+        :param seconds: seconds the worker spent on the job
+        :return: dict, the result
+        """
+        latency = None if job["submitted"] is None else time.time() - job["submitted"]
+        try:
+            result.update(id=job["id"], parser=job["parser"], latency_seconds=latency)
+            write_json(os.path.join(self.spool, "done", job["id"] + ".json"), result)
+            try:
+                os.remove(self.processing(job["id"]))
+            except FileNotFoundError:
+                # moved back to incoming by hand or by a service that took this one for dead
+                pass
+        finally:
+            with self.lock:
+                self.in_flight.discard(job["id"])
+                self.suspects.discard(job["id"])
+        with self.lock:
+            self.completed += 1
+            if latency is not None:
+                self.latencies.append(latency)
+            throughput = self.throughput.setdefault(job["parser"], {"files": 0, "seconds": 0.0})
+            throughput["files"] += 1
+            throughput["seconds"] += seconds
+        return result
+
+    def stats(self):
+        """
+        statistics of the service:
+
+        >>> {"queue_depth": 12, "in_flight": 4, "completed": 130, "uptime_seconds": 60.2,
+        ...  "latency_seconds": {"p50": 0.4, "p90": 1.2, "p99": 3.1},
+        ...  "parsers": {"mypackage.parsers:ExampleParser": {"files": 130, "seconds": 40.1, "files_per_second": 3.2}}}
+
+        *seconds* is the time the workers spent on the files of a parser, so *files_per_second* is the throughput of
+        one worker.
+
+        :return: dict
+        """
+        queue_depth = len(self.incoming())
+        with self.lock:
+            latencies = sorted(self.latencies)
+            return {"queue_depth": queue_depth,
+                    "in_flight": len(self.in_flight),
+                    "completed": self.completed,
+                    "uptime_seconds": time.time() - self.started,
+                    "latency_seconds": {"p50": percentile(latencies, 50),
+                                        "p90": percentile(latencies, 90),
+                                        "p99": percentile(latencies, 99)},
+                    "parsers": {parser_path: dict(throughput,
+                                                  files_per_second=throughput["files"] / throughput["seconds"]
+                                                  if throughput["seconds"] else None)
+                                for parser_path, throughput in self.throughput.items()}}
+
+    def write_stats(self):
+        """
+        writes :meth:`stats` to *stats.json* in the spool directory
+
+        :return: None
+        """
+        write_json(os.path.join(self.spool, "stats.json"), self.stats())
+
+
+def init_worker(parser_paths, memory_limit=None):
+    """
+    creates the parsers of a worker process once, like :func:`validpanda.cli.init_worker`
+
+    :param parser_paths: list of parser paths, see :func:`validpanda.cli.load_parser_class`
+    :param memory_limit: memory budget in bytes for the validation of one file, None for no limit
+    :return: None
+    """
+    global worker_memory_limit
+    for parser_path in parser_paths:
+        worker_parsers[parser_path] = load_parser_class(parser_path)()
+    worker_memory_limit = memory_limit
+
+
+def validate_job(parser_path, path):
+    """
+    validates the file of a job with the warm parser of the worker process, creates it if needed
+
+    :param parser_path: see :func:`validpanda.cli.load_parser_class`
+    :param path: path to the file
+    :return: dict, the json line of the file and the seconds spent on it
+    """
+    start = time.perf_counter()
+    parser = worker_parsers.get(parser_path)
+    if parser is None:
+        parser = worker_parsers[parser_path] = load_parser_class(parser_path)()
+    return validate_file(parser, path, worker_memory_limit), time.perf_counter() - start
+
+
+def alive(pid):
+    """
+    :param pid: process id
+    :return: True if a process with this id is running
+    """
+    if os.name == "nt":
+        # os.kill would terminate the process on windows
+        import ctypes
+
+        handle = ctypes.windll.kernel32.OpenProcess(0x1000, False, pid)
+        if not handle:
+            return False
+        ctypes.windll.kernel32.CloseHandle(handle)
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # running, but owned by another user
+        return True
+    return True
+
+
+def percentile(values, p):
+    """
+    nearest-rank percentile
+
+    :param values: sorted list
+    :param p: percentile between 0 and 100
+    :return: value, None if there are no values
+    """
+    if not values:
+        return None
+    return values[max(0, min(len(values) - 1, math.ceil(p / 100 * len(values)) - 1))]
+
+
+def write_json(path, data):
+    """
+    writes a json file atomically, so readers never see half of it
+
+    :param path: path to the file
+    :param data: json serialisable data
+    :return: None
+    """
+    temporary = "{}.{}.tmp".format(path, uuid.uuid4().hex)
+    with open(temporary, "w") as f:
+        json.dump(data, f)
+    os.replace(temporary, path)
+
+
+def submit(spool, parser_path, path):
+    """
+    adds a job to a spool directory
+
+    :param spool: path to the spool directory
+    :param parser_path: see :func:`validpanda.cli.load_parser_class`
+    :param path: path to the file to validate
+    :return: id of the job
+    """
+    submitted = time.time()
+    # ids sort in the order of submission
+    job_id = "{:017.6f}-{}".format(submitted, uuid.uuid4().hex)
+    os.makedirs(os.path.join(spool, "incoming"), exist_ok=True)
+    job = {"id": job_id, "parser": parser_path, "path": os.path.abspath(path), "submitted": submitted}
+    temporary = os.path.join(spool, job_id + ".tmp")
+    with open(temporary, "w") as f:
+        json.dump(job, f)
+    os.replace(temporary, os.path.join(spool, "incoming", job_id + ".json"))
+    return job_id
+
+
+def result(spool, job_id, timeout=None, poll_interval=0.05):
+    """
+    waits for the result of a job
+
+    :param spool: path to the spool directory
+    :param job_id: id returned by :func:`submit`
+    :param timeout: seconds to wait, forever if None
+    :param poll_interval: seconds between the checks
+    :return: dict, the result
+    """
+    path = os.path.join(spool, "done", job_id + ".json")
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while not os.path.exists(path):
+        if deadline is not None and time.monotonic() > deadline:
+            raise TimeoutError("job {} is not done after {} s".format(job_id, timeout))
+        time.sleep(poll_interval)
+    with open(path) as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    """
+    entry point of the *validpanda-service* console command
+
+    :param argv: command line arguments, sys.argv by default
+    :return: exit code
+    """
+    argument_parser = argparse.ArgumentParser(prog="validpanda-service",
+                                              description="long-lived validation service with a spool directory")
+    commands = argument_parser.add_subparsers(dest="command", required=True)
+    run_command = commands.add_parser("run", help="validate the jobs of a spool directory until stopped")
+    run_command.add_argument("spool", help="spool directory")
+    run_command.add_argument("-p", "--parser", action="append", default=[],
+                             help="parser class to keep warm, e.g. mypackage.parsers:ExampleParser (repeatable)")
+    run_command.add_argument("-w", "--workers", type=int, default=4, help="amount of jobs validated at the same time")
+    run_command.add_argument("--memory-budget", type=int, default=None,
+                             help="memory budget in MB for the validation of one file")
+    submit_command = commands.add_parser("submit", help="add a job to a spool directory")
+    submit_command.add_argument("spool", help="spool directory")
+    submit_command.add_argument("parser", help="parser class, e.g. mypackage.parsers:ExampleParser")
+    submit_command.add_argument("path", help="file to validate")
+    submit_command.add_argument("--wait", action="store_true", help="wait for the result and print it")
+    submit_command.add_argument("--timeout", type=float, default=None, help="seconds to wait for the result")
+    stats_command = commands.add_parser("stats", help="print the statistics of a running service")
+    stats_command.add_argument("spool", help="spool directory")
+    arguments = argument_parser.parse_args(argv)
+
+    if arguments.command == "run":
+        memory_limit = None if arguments.memory_budget is None else arguments.memory_budget * 1024 ** 2
+        service = ValidationService(arguments.spool, arguments.parser, arguments.workers, memory_limit)
+        signal.signal(signal.SIGTERM, lambda signum, frame: service.stop())
+        try:
+            service.serve_forever()
+        except KeyboardInterrupt:
+            service.stop()
+        return 0
+    if arguments.command == "submit":
+        job_id = submit(arguments.spool, arguments.parser, arguments.path)
+        if not arguments.wait:
+            print(job_id)
+            return 0
+        job_result = result(arguments.spool, job_id, arguments.timeout)
+        print(json.dumps(job_result))
+        return 0 if job_result["status"] == "valid" else 1
+    with open(os.path.join(arguments.spool, "stats.json")) as f:
+        print(f.read())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+"""
+Shared
+------
+
+Defines *SharedFrame* class of the validpanda package
+"""
+import errno
+import mmap
+import os
+import pickle
+import tempfile
+
+ALIGNMENT = 64
+"""every buffer in the file starts at a multiple of this many bytes"""
+
+
+class SharedFrame:
+    """
+    Hands a dataframe to a worker process through a memory-mapped file instead of the pipe of the executor. Only the
+    path and the offsets are pickled when a SharedFrame is sent to a worker, the worker maps the file and rebuilds
+    the dataframe from it.
+
+    >>> with SharedFrame(dataframe) as shared:
+    ...     executor.submit(function, shared)
+
+    and in the worker
+
+    >>> dataframe = shared.attach()
+
+    The file is written column by column:
+
+     * string columns (the 'object' columns validpanda validates) are written as Arrow string arrays: the offsets,
+       the utf-8 bytes and the validity bitmap. The worker rebuilds the python strings from the mapping in one pass,
+       which is several times faster than pickling them. Missing values come back as the value they were (None or
+       NaN). This needs pyarrow (``pip install validpanda[export]``), without it they are pickled.
+     * numeric columns are pickled with protocol 5 and their data is written as out-of-band buffer, the worker gets
+       read-only arrays that point into the mapping.
+     * all other columns, e.g. object columns with mixed types, are pickled.
+
+    The file is removed when the context is left, also on errors and cancellation. Workers that already mapped it
+    keep their mapping until their dataframe is garbage collected.
+    """
+
+    def __init__(self, dataframe, directory=None):
+        if directory is None:
+            # /dev/shm is memory, not disk
+            directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+        try:
+            import pyarrow
+        except ImportError:
+            pyarrow = None
+        descriptor, self.path = tempfile.mkstemp(prefix="validpanda_", suffix=".frame", dir=directory)
+        """path to the memory-mapped file"""
+        self.labels = dataframe.columns
+        """column labels of the dataframe"""
+        self.index = None
+        """how the index is stored in the file"""
+        self.columns = []
+        """how every column is stored in the file, ("arrow", length, null count, missing value, buffers) or
+        ("pickle", stream, buffers) with the offset and length of every buffer"""
+        try:
+            with os.fdopen(descriptor, "wb") as f:
+                self.index = self.write_pickle(f, dataframe.index)
+                for position in range(dataframe.shape[1]):
+                    series = dataframe.iloc[:, position]
+                    column = None
+                    if pyarrow is not None and series.dtype == object:
+                        column = self.write_strings(f, series.to_numpy(), pyarrow)
+                    if column is None:
+                        column = self.write_pickle(f, series.array)
+                    self.columns.append(column)
+        except BaseException:
+            self.close()
+            raise
+
+    def __getstate__(self):
+        return {"path": self.path, "labels": self.labels, "index": self.index, "columns": self.columns}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @staticmethod
+    def write(f, data):
+        """
+        writes a buffer at the next aligned offset
+
+        :param f: file opened for writing
+        :param data: object supporting the buffer protocol
+        :return: offset and length
+        """
+        f.write(b"\0" * (-f.tell() % ALIGNMENT))
+        offset = f.tell()
+        return offset, f.write(data)
+
+    @classmethod
+    def write_pickle(cls, f, values):
+        """
+        :param f: file opened for writing
+        :param values: index, array or any other picklable object
+        :return: ("pickle", stream, buffers)
+        """
+        buffers = []
+        stream = cls.write(f, pickle.dumps(values, protocol=5, buffer_callback=buffers.append))
+        return "pickle", stream, [cls.write(f, buffer.raw()) for buffer in buffers]
+
+    @classmethod
+    def write_strings(cls, f, values, pyarrow):
+        """
+        :param f: file opened for writing
+        :param values: numpy array with 'object' datatype
+        :param pyarrow: pyarrow module
+        :return: ("arrow", length, null count, missing value, buffers), None if the values are not only strings and
+                 one kind of missing value
+        """
+        import pandas as pd
+
+        if pd.api.types.infer_dtype(values, skipna=True) not in ("string", "empty"):
+            return None
+        missing = values[pd.isna(values)]
+        if len({type(value) for value in missing}) > 1:
+            return None
+        array = pyarrow.array(values, type=pyarrow.large_string(), from_pandas=True)
+        return ("arrow", len(array), array.null_count, missing[0] if len(missing) else None,
+                [None if buffer is None else cls.write(f, buffer) for buffer in array.buffers()])
+
+    def attach(self):
+        """
+        maps the file and rebuilds the dataframe
+
+        :return: dataframe
+        """
+        import pandas as pd
+
+        with open(self.path, "rb") as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        # the arrays keep the mapping alive through the memoryviews
+        view = memoryview(mapping)
+        dataframe = pd.DataFrame({position: self.read(view, column) for position, column in enumerate(self.columns)},
+                                 copy=False)
+        dataframe.index = self.read(view, self.index)
+        dataframe.columns = self.labels
+        return dataframe
+
+    @staticmethod
+    def read(view, column):
+        """
+        :param view: memoryview of the mapping
+        :param column: how the values are stored, see *columns*
+        :return: values
+        """
+        if column[0] == "pickle":
+            _, (offset, length), buffers = column
+            return pickle.loads(view[offset:offset + length], buffers=[view[offset:offset + length]
+                                                                       for offset, length in buffers])
+        import pandas as pd
+        import pyarrow
+
+        _, length, null_count, missing, buffers = column
+        validity, offsets, data = [None if buffer is None else pyarrow.py_buffer(view[buffer[0]:sum(buffer)])
+                                   for buffer in buffers]
+        array = pyarrow.LargeStringArray.from_buffers(length, offsets, data, validity, null_count)
+        values = array.to_numpy(zero_copy_only=False)
+        if null_count and missing is not None:
+            values[array.is_null().to_numpy(zero_copy_only=False)] = missing
+        # a plain numpy array of strings would be inferred as the string datatype
+        return pd.Series(values, dtype=object, copy=False)
+
+    def close(self):
+        """
+        removes the file
+
+        :return: None
+        """
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def share(dataframe, directory=None):
+    """
+    writes a dataframe to a :class:`SharedFrame`. A small /dev/shm, e.g. the 64 MB of a docker container, may not
+    have room for it, then the dataframe goes through the pipe of the executor as before.
+
+    :param dataframe: pandas dataframe
+    :param directory: see :class:`SharedFrame`
+    :return: SharedFrame, the dataframe itself if there is no space left for the file
+    """
+    try:
+        return SharedFrame(dataframe, directory)
+    except OSError as e:
+        if e.errno != errno.ENOSPC:
+            raise
+        return dataframe
+
+
+def attach(dataframe):
+    """
+    :param dataframe: dataframe or SharedFrame
+    :return: dataframe
+    """
+    if isinstance(dataframe, SharedFrame):
+        return dataframe.attach()
+    return dataframe
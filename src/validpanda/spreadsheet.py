@@ -4,8 +4,9 @@ Spreadsheet
 
 Defines *Spreadsheet* class of the validpanda package
 """
-import pandas as pd
-from .helpers import Helper
+import weakref
+from .backends import get_backend, PANDAS
+from .exceptions import ValidationError
 
 
 class Spreadsheet:
@@ -68,7 +69,7 @@ class Spreadsheet:
             """name of this spreadsheet"""
             self.blocks_allocation = {0: {"coordinates": (None, None), "block": None}}
             """blocks and their coordinates contained in this spreadsheet. see docstring"""
-            self.preprocess_func = lambda x: x.reset_index(drop=True)
+            self.preprocess_func = reset_index
             """an arbitrary function that preprocesses a dataframe and returns a dataframe"""
         else:
             assert(isinstance(blocks_allocation, dict)), \
@@ -81,6 +82,8 @@ class Spreadsheet:
                 "dict keys must be 'coordinates' and 'block'"
             self.blocks_allocation = blocks_allocation
             """blocks and their coordinates contained in this spreadsheet. see docstring"""
+        self.layout = None
+        """weak reference to the last validated dataframe and the layout of its blocks, see :meth:`remember_layout`"""
 
     def get_next_blocks(self, block_id):
         """
@@ -160,7 +163,8 @@ class Spreadsheet:
         # set the beginning of this block
         block_object.zero = tuple([starting_row, starting_col])
         # get the row and column length of this block
-        df = dataframe.iloc[starting_row:, starting_col:].reset_index(drop=True)
+        backend = get_backend(dataframe)
+        df = backend.slice(dataframe, starting_row, None, starting_col, None)
 
         next_row_block, next_col_block = self.get_next_blocks(block_id)
 
@@ -170,54 +174,367 @@ class Spreadsheet:
             row_length = block_object.content_length
         else:
             if next_row_block is None:
-                row_length = df.shape[0]
+                row_length = backend.shape(df)[0]
             else:
                 if not next_row_block.header:
                     raise ValueError("next block in the row direction must have header")
                 else:
-                    next_block_header = tuple(next_row_block.columns)
-
-                    for index, row in df.iterrows():
-                        # cut the row to the length of the header
-                        row = tuple(row[:len(next_block_header)])
-                        if row == next_block_header:
-                            # I found where next block starts
-                            row_length = index - 1
-                            break
+                    # find the first row that starts with the header of the next block
+                    index = self.find_header(df, next_row_block)
+                    if index is not None:
+                        # I found where next block starts
+                        row_length = index - 1
         # find col_length
         if not block_object.header_pattern:
             # easy case
             col_length = len(block_object.columns) - 1
         else:
             # look where header pattern stops
-            this_block_header = tuple(df.iloc[0])
-            pattern = tuple(block_object.columns)
-
-            col_length = Helper.find_pattern(this_block_header, pattern) - 1
+            compiled = block_object.compiled
+            col_length = compiled.pattern_length(compiled.normalize_header(backend.row(df, 0))) - 1
 
         block_object.calculated_row_length = row_length
         block_object.calculated_col_length = col_length
         self.blocks_allocation[block_id]['block'] = block_object
         return tuple([tuple([starting_row, starting_col]), tuple([row_length, col_length])])
 
-    def is_valid(self, dataframe):
+    @staticmethod
+    def find_header(dataframe, block):
+        """
+        :param dataframe: dataframe whose first column is the first column of the block
+        :param block: Block with a header
+        :return: position of the first row that starts with the header of the block after normalization (see
+                 *header_normalization*), None if there is no such row
+        """
+        import numpy as np
+        backend = get_backend(dataframe)
+        compiled = block.compiled
+        width = len(compiled.normalized_header)
+        if backend.shape(dataframe)[1] < width:
+            return None
+        # the first column selects the candidate rows, only they are normalized completely
+        first_cells = compiled.normalize(backend.column(dataframe, 0))
+        for position in np.flatnonzero(first_cells == compiled.normalized_header[0]):
+            if compiled.header_matches(compiled.normalize_header(backend.row(dataframe, position)[:width])):
+                return int(position)
+        return None
+
+    def is_valid(self, dataframe, sampling=None, staged=False, cost_model=None, memory_budget=None):
         """
         core method to validate whether a given dataframe matches this Spreadsheet
 
         :param dataframe: pandas dataframe to be validated.
+        :param sampling: optional :class:`validpanda.sampling.Sampling`, validates the values only on a sample of rows
+        :param staged: if True, the headers of all blocks are checked first (see :meth:`check_structure`) and only then
+                       the values of the columns
+        :param cost_model: optional :class:`validpanda.costs.CostModel`, validates the cheapest columns first
+        :param memory_budget: optional :class:`validpanda.memory.MemoryBudget`, charged with the preprocessed dataframe
+                              and the block being validated
         :return: Boolean
         """
-        # split the dataframe in blocks
-        assert(self.blocks_allocation[0]["coordinates"] == (None, None)), \
-            "Error in spreadsheet {}. block with id 0 must have coordinates (None, None)".format(self.name)
+        if staged:
+            structure = self.check_structure(dataframe, memory_budget=memory_budget)
+            return self.is_valid_structure(structure,
+                                           sampling=sampling,
+                                           cost_model=cost_model,
+                                           memory_budget=memory_budget)
+        self.layout = None
+        layout = {}
+        preprocessed = self.preprocess(dataframe)
+        preprocessed_bytes = self.charge(memory_budget, "preprocessed", preprocessed, dataframe)
+        try:
+            for block_id, block, block_df in self.iter_blocks(preprocessed):
+                block_bytes = self.charge(memory_budget, "block", block_df, preprocessed)
+                try:
+                    content_df, dataframe_header_dict = block.check_header(block_df)
+                    layout[block_id] = self.block_layout(block, dataframe_header_dict)
+                    valid = block.is_valid_content(content_df, dataframe_header_dict,
+                                                   sampling=sampling,
+                                                   cost_model=cost_model,
+                                                   memory_budget=memory_budget)
+                finally:
+                    self.release(memory_budget, "block", block_bytes)
+                del block_df
+                if not valid:
+                    return False
+        finally:
+            self.release(memory_budget, "preprocessed", preprocessed_bytes)
+        self.remember_layout(dataframe, layout)
+        return True
+
+    def check_structure(self, dataframe, memory_budget=None):
+        """
+        first, cheap stage of the validation: resolves the layout and checks the header, the shape and the pattern of
+        every block, without looking at the values.
+
+        :param dataframe: pandas dataframe to be validated.
+        :param memory_budget: optional :class:`validpanda.memory.MemoryBudget`, charged with the content of every
+                              block until :meth:`is_valid_structure` validated it
+        :return: list of Block, content dataframe, dict that maps the dataframe columns to the names of the columns,
+                 bytes charged to the memory budget
+        """
+        self.layout = None
+        layout = {}
+        preprocessed = self.preprocess(dataframe)
+        structure = []
+        try:
+            for block_id, block, block_df in self.iter_blocks(preprocessed):
+                content_df, dataframe_header_dict = block.check_header(block_df)
+                layout[block_id] = self.block_layout(block, dataframe_header_dict)
+                structure.append((block, content_df, dataframe_header_dict,
+                                  self.charge(memory_budget, "block", content_df, dataframe)))
+        except Exception:
+            self.release(memory_budget, "block", sum(entry[3] for entry in structure))
+            raise
+        self.remember_layout(dataframe, layout)
+        return structure
+
+    @classmethod
+    def is_valid_structure(cls, structure, sampling=None, cost_model=None, memory_budget=None):
+        """
+        second, expensive stage of the validation: validates the values of the columns of all blocks returned by
+        :meth:`check_structure`
+
+        :param structure: list returned by :meth:`check_structure`
+        :param sampling: optional :class:`validpanda.sampling.Sampling`, validates the values only on a sample of rows
+        :param cost_model: optional :class:`validpanda.costs.CostModel`, validates the cheapest columns first
+        :param memory_budget: optional :class:`validpanda.memory.MemoryBudget`
+        :return: Boolean
+        """
+        try:
+            while structure:
+                block, content_df, dataframe_header_dict, block_bytes = structure.pop(0)
+                try:
+                    valid = block.is_valid_content(content_df, dataframe_header_dict,
+                                                   sampling=sampling,
+                                                   cost_model=cost_model,
+                                                   memory_budget=memory_budget)
+                finally:
+                    cls.release(memory_budget, "block", block_bytes)
+                del content_df
+                if not valid:
+                    return False
+        finally:
+            while structure:
+                cls.release(memory_budget, "block", structure.pop()[3])
+        return True
+
+    @staticmethod
+    def charge(memory_budget, stage, dataframe, original):
+        """
+        charges the memory a dataframe allocated on top of the dataframe it was made from to a memory budget
+
+        :param memory_budget: :class:`validpanda.memory.MemoryBudget` or None
+        :param stage: name of the stage
+        :param dataframe: pandas dataframe
+        :param original: pandas dataframe that is held already, columns sharing its memory are not charged
+        :return: charged bytes
+        """
+        if memory_budget is None or dataframe is original:
+            return 0
+        return memory_budget.charge(stage, memory_budget.size(dataframe, held=original))
+
+    @staticmethod
+    def release(memory_budget, stage, nbytes):
+        """
+        releases bytes charged with :meth:`charge`
+
+        :param memory_budget: :class:`validpanda.memory.MemoryBudget` or None
+        :param stage: name of the stage
+        :param nbytes: charged bytes
+        :return: None
+        """
+        if memory_budget is not None:
+            memory_budget.release(stage, nbytes)
+
+    def is_valid_stream(self, chunks):
+        """
+        validates a spreadsheet that is too big for the memory and comes in row chunks, for example from
+        *pd.read_csv(path, header=None, dtype=object, chunksize=100000)*.
+
+        The layout is resolved on the first chunk, which must contain every block except the trailing ones, i.e.
+        blocks without *content_length* and without a next block in row direction that run until the end of the
+        spreadsheet. All remaining chunks are validated only against the columns of the trailing blocks, one chunk at
+        a time. *preprocess_func* is applied to every chunk, so it must work row by row.
+
+        :param chunks: iterable of pandas dataframes, the consecutive rows of the spreadsheet
+        :return: Boolean
+        """
+        chunks = iter(chunks)
+        first_chunk = next(chunks)
+        next_chunk = next(chunks, None)
+        if next_chunk is None:
+            return self.is_valid(first_chunk)
+        first_chunk = self.preprocess(first_chunk)
+
+        trailing_blocks = self.get_trailing_blocks()
+        # the trailing blocks that still have to be streamed, in the order of the blocks, with the columns left to
+        # validate in each of them
+        trailing = []
+        failure = None
+        for position, (block_id, block, block_df) in enumerate(self.iter_blocks(first_chunk)):
+            (zero_row, zero_col), row_length, col_length = block.zero, block.calculated_row_length, \
+                block.calculated_col_length
+            try:
+                if block_id in trailing_blocks:
+                    if zero_row >= first_chunk.shape[0]:
+                        raise ValueError("Spreadsheet {}. The header of block {} is not in the first chunk, "
+                                         "increase the chunk size".format(self.name, block.name))
+                    content_df, dataframe_header_dict = block.check_header(block_df)
+                    columns = block.columns_order(content_df, dataframe_header_dict)
+                    trailing.append([block, zero_row, zero_col, col_length, dataframe_header_dict, columns])
+                    block.check_content(content_df, dataframe_header_dict, columns=columns)
+                else:
+                    next_row_block = self.get_next_blocks(block_id)[0]
+                    # an open-ended block whose next block was not found in the first chunk looks like an empty one
+                    if zero_row + row_length >= first_chunk.shape[0] or (
+                            not block.content_length and next_row_block is not None and self.find_header(
+                                get_backend(first_chunk).slice(first_chunk, zero_row + row_length + 1,
+                                                               zero_row + row_length + 2, zero_col, None),
+                                next_row_block) is None):
+                        raise ValueError("Spreadsheet {}. Block {} does not fit into the first chunk, "
+                                         "increase the chunk size".format(self.name, block.name))
+                    block.is_valid(block_df)
+            except ValidationError as e:
+                # the blocks before this one can still fail in a later chunk, the blocks after it are never reached
+                failure = self.narrow(trailing, block, e)
+                break
+
+        # row number of the first row of the current chunk in the spreadsheet
+        offset = first_chunk.shape[0]
+        while next_chunk is not None and any(columns for *_, columns in trailing):
+            chunk = self.preprocess(next_chunk)
+            for block, zero_row, zero_col, col_length, dataframe_header_dict, columns in list(trailing):
+                if not columns:
+                    continue
+                block_df = chunk.loc[:, zero_col: zero_col + col_length]
+                # number the rows inside of the block, the header being row 0
+                block_df.index = range(offset - zero_row, offset - zero_row + block_df.shape[0])
+                try:
+                    block.check_content(block_df, dataframe_header_dict, columns=columns)
+                except ValidationError as e:
+                    failure = self.narrow(trailing, block, e)
+                    break
+            offset += chunk.shape[0]
+            next_chunk = next(chunks, None)
+        if failure is not None:
+            raise failure
+        return True
+
+    @staticmethod
+    def narrow(trailing, block, failure):
+        """
+        keeps the first-failure semantics of :meth:`is_valid` while streaming: after a failure only the trailing
+        blocks before the failing block and, in the failing block, the columns before the failing column have to be
+        validated in the remaining chunks, like :meth:`validpanda.block.Block.check_chunks` does.
+
+        :param trailing: list of the streamed trailing blocks, changed in place
+        :param block: failing Block
+        :param failure: ValidationError
+        :return: failure
+        """
+        for indx, state in enumerate(trailing):
+            if state[0] is block:
+                columns = state[5]
+                state[5] = columns[:columns.index(failure.column_index)] if failure.column_index in columns else []
+                del trailing[indx + 1:]
+                break
+        return failure
+
+    def get_trailing_blocks(self):
+        """
+        ids of the blocks that run until the end of the spreadsheet: no *content_length* and no next block in
+        row direction
+
+        :return: set of block ids
+        """
+        return {block_id for block_id, block_data in self.blocks_allocation.items()
+                if not block_data['block'].content_length and self.get_next_blocks(block_id)[0] is None}
 
+    def preprocess(self, dataframe):
+        """
+        applies *preprocess_func* to the dataframe
+
+        :param dataframe: pandas dataframe
+        :return: preprocessed dataframe
+        """
         if self.preprocess_func is not None:
             try:
                 dataframe = self.preprocess_func(dataframe)
-                assert(isinstance(dataframe, pd.DataFrame)), \
+                assert(get_backend(dataframe).is_frame(dataframe)), \
                     "The preprocessing function in {} returned {} not a dataframe".format(self.name, type(dataframe))
             except Exception as e:
                 raise ValueError("Could not preprocess the dataframe, raised exception:\n {}".format(e))
+        return dataframe
+
+    @staticmethod
+    def block_layout(block, dataframe_header_dict):
+        """
+        :return: the resolved position of a block, its size and its header dict
+        """
+        return block.zero, block.calculated_row_length, block.calculated_col_length, dataframe_header_dict
+
+    def remember_layout(self, dataframe, layout):
+        """
+        keeps the layout resolved for a dataframe, so that it can be reused by :meth:`iter_layout` as long as the
+        dataframe exists. Only a weak reference to the dataframe is kept.
+
+        :param dataframe: dataframe passed to :meth:`is_valid` or :meth:`check_structure`
+        :param layout: dict of block id and :meth:`block_layout`
+        :return: None
+        """
+        try:
+            self.layout = (weakref.ref(dataframe), layout)
+        except TypeError:
+            self.layout = None
+
+    def resolved_layout(self, dataframe):
+        """
+        :param dataframe: dataframe
+        :return: the layout remembered for this dataframe, None if the last validation was of another dataframe or
+                 did not resolve the whole layout
+        """
+        layout = getattr(self, "layout", None)
+        if layout is None or layout[0]() is not dataframe:
+            return None
+        return layout[1]
+
+    def iter_layout(self, dataframe, layout):
+        """
+        splits a preprocessed dataframe into blocks with a layout resolved before, without resolving the sizes and
+        checking the headers again
+
+        :param dataframe: preprocessed dataframe
+        :param layout: see :meth:`resolved_layout`
+        :return: generator of block_id, Block, content dataframe, dict that maps the dataframe columns to the names of
+                 the columns
+        """
+        backend = get_backend(dataframe)
+        for block_id, block_data in self.blocks_allocation.items():
+            (zero_row, zero_col), row_length, col_length, dataframe_header_dict = layout[block_id]
+            block = block_data['block']
+            row_correction = 0 if block.header else 1
+            block_df = backend.slice(dataframe,
+                                     zero_row, zero_row + row_length - row_correction + 1,
+                                     zero_col, zero_col + col_length + 1)
+            yield block_id, block, backend.content(block_df) if block.header else block_df, dataframe_header_dict
+
+    def __getstate__(self):
+        # weak references can not be pickled, the layout is only valid in this process anyway
+        state = dict(self.__dict__)
+        state.pop("layout", None)
+        return state
+
+    def iter_blocks(self, dataframe):
+        """
+        splits a preprocessed dataframe into blocks.
+
+        :param dataframe: pandas dataframe
+        :return: generator of block_id, Block, block dataframe with the header being the first row
+        """
+        # split the dataframe in blocks
+        assert(self.blocks_allocation[0]["coordinates"] == (None, None)), \
+            "Error in spreadsheet {}. block with id 0 must have coordinates (None, None)".format(self.name)
 
         # get each block and validate it by
         # iterating over blocks here and recursively check if previous block in row and col direction
@@ -228,11 +545,24 @@ class Spreadsheet:
                 row_correction = 0
             else:
                 row_correction = 1
-            block_df = dataframe.loc[zero_row: zero_row + row_length - row_correction, zero_col: zero_col + col_length].reset_index(
-                drop=True)
-            if not block_data['block'].is_valid(block_df):
-                return False
-        return True
+            block_df = get_backend(dataframe).slice(dataframe,
+                                                    zero_row, zero_row + row_length - row_correction + 1,
+                                                    zero_col, zero_col + col_length + 1)
+            yield block_id, block_data['block'], block_df
+            # do not keep the previous block while the next one is cut
+            del block_df
+
+
+def reset_index(dataframe):
+    """
+    default preprocessing function of a Spreadsheet
+
+    :param dataframe: pandas dataframe
+    :return: dataframe with a fresh index, polars dataframes have no index and are returned as they are
+    """
+    if get_backend(dataframe) is not PANDAS:
+        return dataframe
+    return dataframe.reset_index(drop=True)
 
 
 if __name__ == "__main__":